@@ -0,0 +1,159 @@
+'''
+摘录数据库维护工具（命令行）
+
+用法：
+    python db_tool.py rebuild-index excerpts1.db     # 重建全文索引
+    python db_tool.py check-counts excerpts1.db      # 检查并修复标签计数缓存
+    python db_tool.py import 数据1.txt excerpts3.db   # 将格式化文本直接导入数据库
+    python db_tool.py import 备份.jsonl excerpts3.db  # 导入 JSON / JSON Lines（流式、单事务）
+    python db_tool.py export excerpts1.db 备份.jsonl  # 流式导出为 JSON / JSON Lines
+    python db_tool.py export excerpts1.db 差异.jsonl --since 120  # 只导出变更序号 120 之后的变化
+    python db_tool.py backup excerpts1.db 备份.db     # 在线备份数据库（备份期间仍可读写）
+
+数据库参数可以是文件路径，也可以是 data/ 目录下的文件名。
+本工具不需要安装 PySide6。
+'''
+
+
+
+import sys, time, argparse
+from pathlib import Path
+
+from excerpts.sqlutils import SqlDataManager, get_sql_path, READONLY_PROFILE
+from parse_quotes_file_tool import iter_quotes, import_quotes
+
+
+def resolve_db_path(name: str, must_exist: bool = True) -> Path:
+    """解析数据库路径，不存在时在 data/ 目录下查找"""
+    path = Path(name)
+    if not path.is_file() and path.parent == Path("."):
+        path = get_sql_path()/name
+    if must_exist and not path.is_file():
+        raise SystemExit(f"错误：找不到数据库文件 {name}")
+    return path
+
+
+def rebuild_index(args: argparse.Namespace) -> None:
+    with SqlDataManager(resolve_db_path(args.db)) as manager:
+        if not manager.get_excerpts_helper().fts_enabled:
+            raise SystemExit("错误：当前 sqlite 不支持 FTS5 trigram 分词，搜索将使用 LIKE")
+        manager.rebuild_search_index()
+    print(f"已重建全文索引：{args.db}")
+
+
+def check_counts(args: argparse.Namespace) -> None:
+    with SqlDataManager(resolve_db_path(args.db)) as manager:
+        mismatches = manager.check_tag_counts(repair=not args.dry_run)
+    for tag_cid, (cached, actual) in mismatches.items():
+        print(f"{tag_cid}: 缓存 {cached}，实际 {actual}")
+    if not mismatches:
+        print("标签计数一致")
+    elif not args.dry_run:
+        print(f"已重建标签计数（{len(mismatches)} 个标签不一致）")
+
+
+def import_text(args: argparse.Namespace) -> None:
+    if not Path(args.text).is_file():
+        raise SystemExit(f"错误：找不到文本文件 {args.text}")
+    db_path = resolve_db_path(args.db, must_exist=False)
+    start = time.perf_counter()
+
+    def report(rows: int) -> None:
+        seconds = time.perf_counter() - start
+        print(f"\r已导入 {rows} 条（{rows / seconds:.0f} 条/秒）", end="", file=sys.stderr, flush=True)
+
+    with SqlDataManager(db_path) as manager:
+        if args.text.endswith((".json", ".jsonl")):
+            stats = manager.import_json(args.text, args.batch_size, args.skip_errors,
+                                        None if args.quiet else report)
+        else:
+            stats = import_quotes(iter_quotes(args.text), manager, args.batch_size,
+                                  None if args.quiet else report)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"{db_path}：{stats}")
+
+
+def export_data(args: argparse.Namespace) -> None:
+    fmt = args.format or ("jsonl" if args.output.endswith(".jsonl") else "json")
+    start = time.perf_counter()
+
+    def report(rows: int) -> None:
+        print(f"\r已导出 {rows} 条", end="", file=sys.stderr, flush=True)
+
+    with SqlDataManager(resolve_db_path(args.db), attach=True, profile=READONLY_PROFILE) as manager:
+        changelog = manager.get_changelog_helper()
+        watermark = changelog.watermark() if changelog else None
+        count = manager.export_json(args.output, fmt, progress=None if args.quiet else report,
+                                    since=args.since)
+    if not args.quiet:
+        print(file=sys.stderr)
+    seconds = time.perf_counter() - start
+    print(f"{args.output}：导出 {count} 条，用时 {seconds:.2f} 秒")
+    if watermark is not None:
+        print(f"下次差异导出使用 --since {watermark}，用 import 命令应用到备份库")
+
+
+def backup(args: argparse.Namespace) -> None:
+    target = Path(args.target)
+    if target.exists() and not args.force:
+        raise SystemExit(f"错误：{target} 已存在，使用 --force 覆盖")
+    for suffix in ("-wal", "-shm"):
+        Path(f"{target}{suffix}").unlink(missing_ok=True)
+
+    def report(done: int, total: int) -> None:
+        print(f"\r已复制 {done}/{total} 页", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    with SqlDataManager(resolve_db_path(args.db), attach=True, profile=READONLY_PROFILE) as manager:
+        manager.backup_to(target, args.pages, None if args.quiet else report)
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"已备份到 {target}，用时 {time.perf_counter() - start:.2f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="摘录数据库维护工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p_rebuild = subparsers.add_parser("rebuild-index", help="重建摘录全文索引")
+    p_rebuild.add_argument("db", help="数据库文件")
+    p_rebuild.set_defaults(func=rebuild_index)
+
+    p_counts = subparsers.add_parser("check-counts", help="检查标签计数缓存，不一致时重建")
+    p_counts.add_argument("db", help="数据库文件")
+    p_counts.add_argument("--dry-run", action="store_true", help="只检查，不修复")
+    p_counts.set_defaults(func=check_counts)
+
+    p_import = subparsers.add_parser("import", help="将格式化文本或 JSON / JSON Lines 流式导入数据库（不存在时新建）")
+    p_import.add_argument("text", help="格式化文本文件（格式见 parse_quotes_file_tool.py），或 .json / .jsonl 文件")
+    p_import.add_argument("db", help="数据库文件")
+    p_import.add_argument("--batch-size", type=int, default=5000, help="每批写入的条数（默认 5000）")
+    p_import.add_argument("--skip-errors", action="store_true", help="JSON 导入时跳过出错的批次")
+    p_import.add_argument("--quiet", action="store_true", help="不显示进度")
+    p_import.set_defaults(func=import_text)
+
+    p_export = subparsers.add_parser("export", help="流式导出标签和摘录")
+    p_export.add_argument("db", help="数据库文件")
+    p_export.add_argument("output", help="导出文件（.jsonl 后缀默认导出为 JSON Lines）")
+    p_export.add_argument("--format", choices=("json", "jsonl"), help="导出格式")
+    p_export.add_argument("--since", type=int, help="差异导出：只导出该变更序号之后变化的标签和摘录")
+    p_export.add_argument("--quiet", action="store_true", help="不显示进度")
+    p_export.set_defaults(func=export_data)
+
+    p_backup = subparsers.add_parser("backup", help="在线备份数据库")
+    p_backup.add_argument("db", help="数据库文件")
+    p_backup.add_argument("target", help="备份文件")
+    p_backup.add_argument("--pages", type=int, default=256, help="每步复制的页数（默认 256）")
+    p_backup.add_argument("--force", action="store_true", help="覆盖已存在的备份文件")
+    p_backup.add_argument("--quiet", action="store_true", help="不显示进度")
+    p_backup.set_defaults(func=backup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,12 @@
-from .qtrun import run as qt_run
-from .htmlrun import run as html_run
-from .sqlutils import get_sql_path
\ No newline at end of file
+from .sqlutils import get_sql_path
+
+
+# 界面入口按需导入，只使用 sqlutils 时不需要安装 PySide6 / flask
+def qt_run(*args, **kwargs):
+    from .qtrun import run
+    return run(*args, **kwargs)
+
+
+def html_run(*args, **kwargs):
+    from .htmlrun import run
+    return run(*args, **kwargs)
\ No newline at end of file
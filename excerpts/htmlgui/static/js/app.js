@@ -90,21 +90,50 @@ async function fetchAndRenderTags() {
 // 卡片动态渲染逻辑
 // ----------------------------------------
 
+const CARD_PAGE_LIMIT = 40; // 每次请求的卡片数量
+const cardPager = {
+    tagCid: 'all',    // 当前标签CID
+    nextCursor: null, // 下一页游标，null 表示没有更多
+    loading: false,   // 是否正在请求
+    generation: 0,    // 切换标签时递增，用于丢弃过期的响应
+};
+
 /**
- * 从后端获取卡片数据并渲染
+ * 从后端获取卡片数据并渲染（第一页，滚动到底部时继续加载）
  * @param {string} [tagCid='all'] - 标签CID，如果为'all'则获取全部
  */
 async function renderCards(tagCid = 'all') {
-    let url = `/api/excerpts/by_tag/${tagCid}`;
+    cardPager.tagCid = tagCid;
+    cardPager.nextCursor = null;
+    cardPager.loading = false;
+    cardPager.generation += 1;
+    masonryContainer.scrollTop = 0;
+    await loadCardPage(true);
+}
+
+/**
+ * 按 next_cursor 加载下一页卡片并追加到容器
+ * @param {boolean} [reset=false] - 是否为第一页（清空容器）
+ */
+async function loadCardPage(reset = false) {
+    if (cardPager.loading || (!reset && !cardPager.nextCursor)) return;
 
+    const generation = cardPager.generation;
+    const params = new URLSearchParams({ limit: CARD_PAGE_LIMIT });
+    if (!reset) params.set('cursor', cardPager.nextCursor);
+    const url = `/api/excerpts/by_tag/${encodeURIComponent(cardPager.tagCid)}?${params}`;
+
+    cardPager.loading = true;
     try {
         const response = await fetch(url);
         if (!response.ok) throw new Error('Failed to fetch cards');
-        const cardData = await response.json(); 
-        
-        masonryContainer.innerHTML = ''; 
+        const page = await response.json(); 
+        if (generation !== cardPager.generation) return; // 已切换标签
+
+        if (reset) masonryContainer.innerHTML = ''; 
+        cardPager.nextCursor = page.next_cursor;
         
-        cardData.forEach(data => {
+        page.excerpts.forEach(data => {
             const card = document.createElement('div');
             card.className = 'card';
             card.style.background = randomPastelColor();
@@ -190,11 +219,26 @@ async function renderCards(tagCid = 'all') {
             masonryContainer.appendChild(card);
         });
     } catch (error) {
+        if (generation !== cardPager.generation) return;
         console.error('Error loading cards:', error);
+        cardPager.nextCursor = null;
         masonryContainer.innerHTML = '<p style="padding:20px; color:red;">加载摘录失败</p>';
+    } finally {
+        if (generation === cardPager.generation) cardPager.loading = false;
+    }
+    // 内容不足一屏时无法触发滚动，继续加载
+    if (generation === cardPager.generation && cardPager.nextCursor
+        && masonryContainer.scrollHeight <= masonryContainer.clientHeight) {
+        loadCardPage();
     }
 }
 
+// 滚动接近底部时加载下一页
+masonryContainer.addEventListener('scroll', () => {
+    const remaining = masonryContainer.scrollHeight - masonryContainer.scrollTop - masonryContainer.clientHeight;
+    if (remaining < 200) loadCardPage();
+});
+
 // 处理删除操作的函数
 async function handleDeleteCard(cid) {
     if (!confirm('确认删除该摘录吗？')) return;
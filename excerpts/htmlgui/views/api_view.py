@@ -4,7 +4,7 @@ import logging
 from typing import Optional
 from pathlib import Path
 
-from ...sqlutils import SqlDataManager, TagData, ExcerptData
+from ...sqlutils import SqlDataManager, SqlbasePool, READONLY_PROFILE, TagData, ExcerptData
 
 # 设置 logging
 logger = logging.getLogger(__name__)
@@ -13,22 +13,41 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 
 
-# 在线程内创建一个独立的SqlDataManager，操作完即释放
+# 按数据库路径复用 SqlDataManager 的连接池，GET 请求使用只读连接
+manager_pool = SqlbasePool(SqlDataManager, max_size = 4)
+reader_pool = SqlbasePool(SqlDataManager, max_size = 8, profile = READONLY_PROFILE)
+
+# 分页请求每页的最大条数
+MAX_PAGE_LIMIT = 200
+
+
+def get_page_limit() -> int:
+    """读取请求的 limit 参数，限制在 1 ~ MAX_PAGE_LIMIT 之间"""
+    return min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_LIMIT)
+
+
+# 每个请求从连接池取出一个SqlDataManager，请求结束后归还
 def get_db_manager() -> SqlDataManager:
     db_key = session.get('db_key')
     if not db_key:
         jsonify({"error": "Database not selected or session expired"}), 403
         abort(403)
     if 'temp_manager' not in flask.g:
-        flask.g.temp_manager = SqlDataManager(Path(db_key))
+        pool = reader_pool if request.method == 'GET' else manager_pool
+        manager: SqlDataManager = pool.acquire(Path(db_key))
+        # 标签可能已被其他连接（如 Qt 界面）修改
+        manager.invalidate_tag_cache()
+        flask.g.temp_manager = manager
+        flask.g.temp_pool = pool
     return flask.g.temp_manager
 
 
 def close_manager(e=None):
-    """请求结束后关闭数据库连接和管理器"""
+    """请求结束后将管理器归还连接池，请求出错时回滚未提交的修改"""
     temp_manager:SqlDataManager = flask.g.pop('temp_manager', None)
+    pool: SqlbasePool = flask.g.pop('temp_pool', None)
     if temp_manager is not None:
-        temp_manager.close()
+        pool.release(temp_manager, rollback = e is not None)
 
 
 # --- 辅助函数：格式化摘录数据 ---
@@ -55,12 +74,12 @@ def get_tags():
     """获取所有标签列表及其包含的摘录数量"""
     manager:SqlDataManager = get_db_manager()
     try:
-        tags = manager.get_tags_helper().get_all_by_order()
+        tags = manager.get_tags_helper().get_all_with_counts()
         
         response_data = []
-        for i, tag in enumerate(tags):
+        for i, (tag, count) in enumerate(tags):
             tag_dict = tag.to_dict()
-            tag_dict['count'] = manager.get_tags_helper().get_excerpts_count(tag.cid)
+            tag_dict['count'] = count
             tag_dict['isActive'] = (i == 0)
             response_data.append(tag_dict)
         
@@ -71,11 +90,30 @@ def get_tags():
 
 
 def get_excerpts(tag_cid: Optional[str] = None):
-    """根据标签 CID 或 'all' 获取摘录列表"""
+    """
+    根据标签 CID 或 'all' 获取摘录列表
+    传入 limit 参数时按页返回 {"excerpts": [...], "next_cursor": ...}，下一页请求带上 cursor 参数
+    """
     manager:SqlDataManager  = get_db_manager()
     
     tag_cid = tag_cid if tag_cid else 'all'
     
+    if 'limit' in request.args:
+        limit = get_page_limit()
+        cursor = request.args.get('cursor') or None
+        excerpts_helper = manager.get_excerpts_helper()
+        try:
+            if tag_cid in ('all', 'default'):
+                excerpts, next_cursor = excerpts_helper.page_all_excerpts(cursor, limit)
+            else:
+                excerpts, next_cursor = excerpts_helper.page_by_tag(tag_cid, cursor, limit)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        return jsonify({
+            "excerpts": [_format_excerpt_for_frontend(e) for e in excerpts],
+            "next_cursor": next_cursor,
+        })
+
     if tag_cid in ('all', 'default'):
         excerpts = manager.get_excerpts_helper().get_all_excerpts()
     else:
@@ -100,12 +138,24 @@ def delete_excerpt(cid):
 
 
 def search_excerpts():
-    """根据关键词搜索摘录 (参数 q)"""
+    """根据关键词搜索摘录 (参数 q)，可选 limit/cursor 分页参数，同 get_excerpts"""
     manager:SqlDataManager = get_db_manager()
     query = request.args.get('q', '') 
     
     if not query:
         return jsonify([])
+
+    if 'limit' in request.args:
+        limit = get_page_limit()
+        cursor = request.args.get('cursor') or None
+        try:
+            data, next_cursor = manager.get_excerpts_helper().page_search(query, cursor, limit)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        return jsonify({
+            "excerpts": [_format_excerpt_for_frontend(e) for e in data],
+            "next_cursor": next_cursor,
+        })
         
     data = manager.get_excerpts_helper().search(query)
     response_data = [_format_excerpt_for_frontend(e) for e in data]
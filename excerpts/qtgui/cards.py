@@ -7,6 +7,7 @@ from PySide6.QtCore import Qt, Signal, QRect, QSize
 from PySide6.QtGui import (QMouseEvent, QColor, QFont, QPen, QPainter,
                          QFontMetrics, QMouseEvent, QLinearGradient)
 from enum import StrEnum
+from typing import Optional
 
 from ..sqlutils import TagData, ExcerptData, SqlDataManager
 
@@ -369,16 +370,20 @@ class DataTagWidget(QWidget):
             self.enter_edit_mode()
         super().mouseDoubleClickEvent(event)
     
-    def reset_tagnum(self):
-        self.count_label.setText(f'({SqlDataManager.instance().get_tag_excerpts_count(self.cid)})')
+    def reset_tagnum(self, tag_num: Optional[int] = None):
+        """刷新摘录数量，未传入 tag_num 时查询数据库"""
+        if tag_num is None:
+            tag_num = SqlDataManager.instance().get_tag_excerpts_count(self.cid)
+        self.count_label.setText(f'({tag_num})')
 
 
 
 class DataTagItem(QListWidgetItem):
     """轻量化数据项，不负责 UI，仅存储值"""
-    def __init__(self, tag: TagData) -> None:
+    def __init__(self, tag: TagData, tag_num: Optional[int] = None) -> None:
         super().__init__()
         self.tag = tag
+        self._tag_num = tag_num # 已知的摘录数量，为 None 时在显示时查询
     
     def add_to(self, listw: QListWidget) -> DataTagWidget:
         widget = DataTagWidget(self.tag, self.tag_num)
@@ -389,4 +394,6 @@ class DataTagItem(QListWidgetItem):
 
     @property
     def tag_num(self):
+        if self._tag_num is not None:
+            return self._tag_num
         return SqlDataManager.instance().get_tag_excerpts_count(self.tag.cid)
\ No newline at end of file
@@ -104,9 +104,13 @@ class MainUI(QWidget):
         if (not SqlDataManager.instance()) or (not self.content.is_load):
             return
         self._on_tag = tag_cid
-        excerpt_ids = self.db_manager.get_tags_helper().get_excerpt_cids(tag_cid)
-        excerpts = self.db_manager.get_excerpts_helper().get_excerpts(excerpt_ids)
-        self.content.masonry.rebuild_cards(excerpts)
+        excerpts_helper = self.db_manager.get_excerpts_helper()
+        if tag_cid == "default":
+            # 每条摘录都带有 default 标签，直接按主排序索引分页，不必经过关联表
+            page_loader = excerpts_helper.page_all_excerpts
+        else:
+            page_loader = lambda cursor, limit: excerpts_helper.page_by_tag(tag_cid, cursor, limit)
+        self.content.masonry.rebuild_cards([], page_loader)
         self.content.tag_title.setText(self.db_manager.get_tag(tag_cid).name)
     
     def on_tags_changed(self):
@@ -115,4 +119,5 @@ class MainUI(QWidget):
     def on_db_changed(self):
         self.sidebar.listw.reload_tags()
         if SqlDataManager.instance():
-            self.content.masonry.rebuild_cards(SqlDataManager.instance().get_all_excerpts())
\ No newline at end of file
+            self.content.masonry.rebuild_cards(
+                [], SqlDataManager.instance().get_excerpts_helper().page_all_excerpts)
\ No newline at end of file
@@ -1,18 +1,23 @@
 
-import uuid, datetime, json, shutil
+import uuid, datetime
 from PySide6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QSizePolicy, QTextEdit, QGridLayout,
                                QListWidget, QListWidgetItem, QScrollArea, QDialog, QMessageBox,
                                QStyledItemDelegate, QStyle, QFrame, QLabel, QLineEdit, QComboBox, 
-                               QGroupBox, QFileDialog, QAbstractItemView, QStyleOptionViewItem)
-from PySide6.QtCore import Qt, Signal, QEvent, QModelIndex, QPersistentModelIndex
+                               QGroupBox, QFileDialog, QAbstractItemView, QStyleOptionViewItem,
+                               QProgressDialog)
+from PySide6.QtCore import Qt, Signal, QEvent, QModelIndex, QPersistentModelIndex, QThread
 from PySide6.QtGui import QPainter
 from typing import Callable, Optional
 from pathlib import Path
 
 from .cards import CardWidget, DataTagItem, TagButton, QPushButton, MColor, DataTagWidget
-from ..sqlutils import SqlDataManager, TagData, ExcerptData, get_db_list
+from ..sqlutils import (SqlDataManager, TagData, ExcerptData, ImportStats, get_db_list,
+                        DEFAULT_PROFILE, READONLY_PROFILE)
 
 
+# 分页加载函数：(cursor, limit) -> (摘录列表, 下一页游标)
+PageLoader = Callable[[Optional[str], int], tuple[list[ExcerptData], Optional[str]]]
+
 
 class NoSelectionDelegate(QStyledItemDelegate):
     def paint(self, painter: QPainter, option: QStyleOptionViewItem,
@@ -68,9 +73,8 @@ class TagList(QListWidget):
         self.clear()
         if not SqlDataManager.instance():
             return
-        tags = SqlDataManager.instance().get_all_tags()
-        for tag in tags:
-            DataTagItem(tag).add_to(self)
+        for tag, tag_num in SqlDataManager.instance().get_all_tags_with_counts():
+            DataTagItem(tag, tag_num).add_to(self)
         # 选中一个tag
         for i in range(self.count()):
             item = self.item(i)
@@ -81,8 +85,12 @@ class TagList(QListWidget):
                 break
 
     def reset_tags(self):
+        if not SqlDataManager.instance():
+            return
+        counts = {tag.cid: tag_num for tag, tag_num in SqlDataManager.instance().get_all_tags_with_counts()}
         for i in range(self.count()):
-            self.itemWidget(self.item(i)).reset_tagnum()
+            tag_widget: DataTagWidget = self.itemWidget(self.item(i))
+            tag_widget.reset_tagnum(counts.get(tag_widget.cid, 0))
 
     def show_all(self):
         if self.mode != 1:
@@ -301,6 +309,8 @@ class MasonryArea(QWidget):
         self.all_cards: dict[str, CardWidget] = [] # 保存所有cards，包括删除的
         self.loaded_count = 0   # 当前已创建的卡片数量
         self.batch_size = 20    # 每次加载 20 张，可调整
+        self.page_loader: Optional[PageLoader] = None # 分页加载函数，为 None 时数据已全部取出
+        self.next_cursor: Optional[str] = None        # 下一页游标
         # 主布局：水平（列 + 最右侧 spacer）
         self.main_layout = QHBoxLayout(self)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
@@ -310,9 +320,14 @@ class MasonryArea(QWidget):
         self.right_spacer.setFixedWidth(0)
         self.right_spacer.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
 
-    def rebuild_cards(self, excerpts: list[ExcerptData]):
-        '''清空 masonry 并重新渲染'''
-        self.all_excerpts = excerpts      # 保存所有数据
+    def rebuild_cards(self, excerpts: list[ExcerptData], page_loader: Optional[PageLoader] = None):
+        '''
+        清空 masonry 并重新渲染
+        page_loader(cursor, limit) 返回 (摘录列表, 下一页游标)，传入时滚动到底部再按页查询数据库
+        '''
+        self.all_excerpts = list(excerpts) # 保存所有数据
+        self.page_loader = page_loader
+        self.next_cursor = None
         self.clear_cards()
         self.temp_cards.clear()
         self.loaded_count = 0             # 当前已创建的卡片数量
@@ -320,6 +335,11 @@ class MasonryArea(QWidget):
         self.load_more_cards()
     
     def load_more_cards(self):
+        if self.page_loader and self.loaded_count + self.batch_size > len(self.all_excerpts):
+            excerpts, self.next_cursor = self.page_loader(self.next_cursor, self.batch_size)
+            self.all_excerpts.extend(excerpts)
+            if self.next_cursor is None:
+                self.page_loader = None
         end = min(self.loaded_count + self.batch_size, len(self.all_excerpts))
         for i in range(self.loaded_count, end):
             self.create_card(self.all_excerpts[i])
@@ -407,7 +427,7 @@ class MasonryArea(QWidget):
         self.sqldata = SqlDataManager.instance()
         if not self.sqldata:
             return
-        self.rebuild_cards(self.sqldata.get_all_excerpts())
+        self.rebuild_cards([], self.sqldata.get_excerpts_helper().page_all_excerpts)
 
     def refresh(self, viewport_width: int):
         cols = viewport_width//400 +1
@@ -990,6 +1010,32 @@ class TagManagerDialog(QDialog):
 
 
 
+# 后台数据库任务：(数据库管理器, 进度回调) -> 结果
+DataTask = Callable[[SqlDataManager, Callable[[int], None]], object]
+
+
+class DataWorker(QThread):
+    """后台数据库任务线程（导入、导出），在线程内打开独立连接，不阻塞界面"""
+    sig_progress = Signal(int)
+    sig_done = Signal(object)
+    sig_failed = Signal(str)
+
+    def __init__(self, db_path: Path, task: DataTask, profile = READONLY_PROFILE,
+                 parent: Optional[QWidget] = None) -> None:
+        super().__init__(parent)
+        self.db_path = db_path
+        self.task = task
+        self.profile = profile
+
+    def run(self) -> None:
+        try:
+            with SqlDataManager(self.db_path, attach=True, profile=self.profile) as manager:
+                result = self.task(manager, self.sig_progress.emit)
+            self.sig_done.emit(result)
+        except Exception as e:
+            self.sig_failed.emit(str(e))
+
+
 class DataManagerDialog(QDialog):
     """数据管理对话框类"""
     def __init__(self, parent: Optional[QWidget] = None) -> None:
@@ -1002,6 +1048,7 @@ class DataManagerDialog(QDialog):
         super().__init__(parent)
         self.sqldata = SqlDataManager.instance()
         self.mainui: QWidget = self.parent().parent()
+        self.worker: Optional[DataWorker] = None  # 正在运行的后台任务，结束前保持引用
         self.init_ui()
     
     def init_ui(self) -> None:
@@ -1077,52 +1124,61 @@ class DataManagerDialog(QDialog):
         self.close_btn.clicked.connect(self.accept)
     
     def export_data(self) -> None:
-        """导出数据到JSON文件"""
+        """在后台线程中流式导出数据到JSON / JSON Lines文件"""
         path = f"{self.mainui.path}/摘录备份_{datetime.date.today()}.json"
         filename, _ = QFileDialog.getSaveFileName(
-            self, "导出数据", path, "JSON Files (*.json)"
+            self, "导出数据", path, "JSON Files (*.json);;JSON Lines (*.jsonl)"
         )
         if not filename: return
         if not self.cover(filename): return
-        excerpts:list[ExcerptData] = self.sqldata.get_all_excerpts()
-        tags:list[TagData] = self.sqldata.get_all_tags()
-        # 转换为可序列化的字典
-        export_data = {
-            'excerpts': [ex.to_dict() for ex in excerpts],
-            'tags': [tag.to_dict() for tag in tags],
-            'export_date': datetime.datetime.now().isoformat()
-        }
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
-            QMessageBox.information(self, "成功", "数据导出成功")
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
+        fmt = "jsonl" if filename.endswith(".jsonl") else "json"
+        worker = DataWorker(self.sqldata.db_path,
+                            lambda manager, progress: manager.export_json(filename, fmt, progress=progress),
+                            parent=self)
+        self.run_worker(worker, "正在导出...", self.sqldata.get_excerpts_helper().count(),
+                        lambda count: QMessageBox.information(self, "成功", f"数据导出成功（{count} 条）"),
+                        "导出失败")
     
     def import_data(self) -> None:
-        """从JSON文件导入数据"""
+        """在后台线程中从JSON / JSON Lines文件流式导入数据"""
         filename, _ = QFileDialog.getOpenFileName(
-            self, "导入数据", str(self.mainui.path), "JSON Files (*.json)"
+            self, "导入数据", str(self.mainui.path), "JSON Files (*.json *.jsonl)"
         )
         if not filename:
             return
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                import_data = json.load(f)
-            excerpts_data = import_data.get('excerpts', [])
-            tags_data = import_data.get('tags', [])
-            # 导入标签
-            existing_tags = self.sqldata.get_tags_helper()
-            existing_tags.insert_or_update_upsert(tags_data)
-            # 导入摘录
-            existing_excerpts = self.sqldata.get_excerpts_helper()
-            excerpts = ExcerptData.from_dict_list(excerpts_data)
-            existing_excerpts.insert_or_update_excerpts(excerpts)
-            self.sqldata.commit()
-            QMessageBox.information(self, "成功", "导入成功!")
-            self.parent().db_changed.emit()
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"导入失败: {str(e)}")
+        worker = DataWorker(self.sqldata.db_path,
+                            lambda manager, progress: manager.import_json(filename, progress=progress),
+                            DEFAULT_PROFILE, self)
+        self.run_worker(worker, "正在导入...", 0, self.on_imported, "导入失败")
+
+    def on_imported(self, stats: ImportStats) -> None:
+        self.sqldata.invalidate_tag_cache()
+        QMessageBox.information(self, "成功", f"导入成功!\n{stats}")
+        self.parent().db_changed.emit()
+
+    def run_worker(self, worker: DataWorker, label: str, total: int,
+                   on_done: Callable[[object], None], error_title: str) -> None:
+        """启动后台任务并显示进度，total 为 0 时只显示已处理的条数"""
+        progress = QProgressDialog(label, None, 0, total, self)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        if total:
+            worker.sig_progress.connect(progress.setValue)
+        else:
+            worker.sig_progress.connect(lambda count: progress.setLabelText(f"{label}\n已处理 {count} 条"))
+        worker.sig_done.connect(progress.close)
+        worker.sig_failed.connect(progress.close)
+        worker.sig_done.connect(on_done)
+        worker.sig_failed.connect(lambda error: QMessageBox.critical(self, "错误", f"{error_title}: {error}"))
+        worker.finished.connect(lambda: self.on_worker_finished(worker))
+        self.worker = worker
+        worker.start()
+
+    def on_worker_finished(self, worker: DataWorker) -> None:
+        """后台线程结束后释放线程对象"""
+        if self.worker is worker:
+            self.worker = None
+        worker.deleteLater()
     
     def reset_data(self) -> None:
         """重置数据库"""
@@ -1170,18 +1226,22 @@ class DataManagerDialog(QDialog):
         )
         if not filename:
             return
-        try:
-            target_path = self.cover(filename)
-            if not target_path: return
-            # 先确保数据已提交
-            self.sqldata.commit()
-            # 直接复制数据库文件
-            shutil.copy2(self.mainui.path/self.mainui.file_name, target_path)
-            QMessageBox.information(self, "成功", f"数据库已另存为：\n{target_path}")
-            self.mainui.init_data(path = target_path.parent, file_name = target_path.name)
-            self.accept()
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"另存为失败: {str(e)}")
+        target_path = self.cover(filename)
+        if not target_path: return
+        # 在后台线程中在线备份，备份期间数据库仍可读写
+        self.sqldata.commit()
+        total = self.sqldata.conn.execute("PRAGMA page_count").fetchone()[0]
+        worker = DataWorker(self.sqldata.db_path,
+                            lambda manager, progress: manager.backup_to(
+                                target_path, progress=lambda done, _: progress(done)),
+                            parent=self)
+        self.run_worker(worker, "正在另存为...", total,
+                        lambda _: self.on_saved_as(target_path), "另存为失败")
+
+    def on_saved_as(self, target_path: Path) -> None:
+        QMessageBox.information(self, "成功", f"数据库已另存为：\n{target_path}")
+        self.mainui.init_data(path = target_path.parent, file_name = target_path.name)
+        self.accept()
 
     def cover(self, filename: str) -> Path:
         path = Path(filename)
@@ -1196,6 +1256,9 @@ class DataManagerDialog(QDialog):
             if reply != QMessageBox.Yes:
                 return None
             path.unlink()  # 删除旧文件
+        # 删除旧文件残留的 WAL 文件，避免被新数据库误读
+        for suffix in ("-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
         return path
 
 
@@ -8,11 +8,12 @@ from .sqlutils import SqlDataManager, get_sql_path
 def run(*, file_name:str = "", tags: list[str] = None, excerpts: list[dict] = None):
     app = QApplication(sys.argv)
     win = MainUI(get_sql_path(), file_name = file_name)
+    name_map = None
     if tags:
-        SqlDataManager.instance().insert_tags_names(tags)
+        name_map = SqlDataManager.instance().insert_tags_names(tags)
         win.on_db_changed()
     if excerpts:
-        SqlDataManager.instance().insert_excerpts_dict(excerpts)
+        SqlDataManager.instance().insert_excerpts_dict(excerpts, name_map = name_map)
         win.on_db_changed()
     win.show()
     sys.exit(app.exec())
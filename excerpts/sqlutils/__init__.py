@@ -1 +1,2 @@
-from .datatool import SqlDataManager, TagData, ExcerptData, get_sql_path, get_db_list
\ No newline at end of file
+from .datatool import SqlDataManager, TagData, ExcerptData, ImportStats, get_sql_path, get_db_list
+from .sqlbase import SqlbasePool, iter_chunks, TableSchema, ConnectionProfile, DEFAULT_PROFILE, READONLY_PROFILE
\ No newline at end of file
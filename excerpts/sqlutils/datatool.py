@@ -1,10 +1,13 @@
-import uuid, random, sqlite3
+import os, uuid, random, sqlite3, json, base64, time, itertools
 from datetime import datetime
-from typing import TypedDict, Optional
-from dataclasses import dataclass, asdict
+from typing import TypedDict, Optional, Iterable, Iterator, Callable, TextIO, Any
+from dataclasses import dataclass, asdict, fields
 from pathlib import Path
 
-from .sqlbase import TableHelper, IdTableHelper, SqlbaseHelper
+from .sqlbase import TableHelper, IdTableHelper, SqlbaseHelper, iter_chunks, IN_CHUNK_VARIABLES, TEMP_KEYS_THRESHOLD
+
+TAG_CIDS_SEP = "\x1f" # group_concat 合并 tag_cid 时使用的分隔符，即 char(31)
+PAGE_ORDER = "e.created_at DESC, e.cid DESC" # 分页查询的排序，与游标 (created_at, cid) 对应
 
 class TagDataDict(TypedDict):
     cid   : str # 标签ID
@@ -131,13 +134,168 @@ class ExcerptData:
             return new
 
 
+def encode_cursor(excerpt: ExcerptData) -> str:
+    """将分页位置 (created_at, cid) 编码为不透明的游标字符串"""
+    raw = json.dumps([excerpt.created_at, excerpt.cid], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """解析 encode_cursor 生成的游标，格式错误时抛出 ValueError"""
+    try:
+        created_at, cid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    return str(created_at), str(cid)
+
+
+@dataclass
+class ImportStats:
+    """导入统计"""
+    rows    : int   = 0   # 导入的摘录条数
+    seconds : float = 0.0 # 耗时（秒）
+    skipped : int   = 0   # 因出错跳过的条数
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        text = f"导入 {self.rows} 条，用时 {self.seconds:.2f} 秒，{self.rows_per_second:.0f} 条/秒"
+        return f"{text}，跳过 {self.skipped} 条" if self.skipped else text
+
+
+EXCERPT_FIELDS = tuple(f.name for f in fields(ExcerptData))
+TAG_FIELDS = tuple(f.name for f in fields(TagData))
+EXPORT_FORMATS = ("json", "jsonl")
+
+
+def excerpt_from_dict(excerpt: dict, name_map: Optional[dict[str, str]] = None) -> Optional[ExcerptData]:
+    """
+    将导入的摘录字典转换为 ExcerptData 并补全默认值，忽略未知字段
+    有 "tags"（标签名称列表）且提供 name_map 时按名称解析为 cid，不存在的名称被忽略；否则使用 "tag_cids"
+    """
+    data = {key: excerpt[key] for key in EXCERPT_FIELDS if key in excerpt}
+    if "tags" in excerpt and name_map is not None:
+        data["tag_cids"] = [name_map[tag] for tag in excerpt["tags"] if tag in name_map]
+    elif "tag_cids" in data:
+        data["tag_cids"] = list(data["tag_cids"])
+    record = ExcerptData.from_dict(data)
+    return ExcerptData.update(record, None) if record is not None else None
+
+
+IMPORT_KEYS = ("tags", "deleted_tags", "deleted_excerpts", "excerpts")
+# JSON 数字中可能出现的字符
+NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+def iter_json_items(file: TextIO, keys: tuple[str, ...] = IMPORT_KEYS,
+                    chunk_size: int = 1 << 16) -> Iterator[tuple[str, Any]]:
+    """
+    增量解析顶层为对象的 JSON 文件，按文件顺序逐个产出 keys 中数组的元素 (键, 元素)
+    每次只读取 chunk_size 个字符，内存占用只与单个元素的大小有关；其余键的值被解析后丢弃
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> None:
+        nonlocal buf, pos, eof
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                raise ValueError("JSON 文件不完整")
+            fill()
+
+    def expect(chars: str) -> str:
+        nonlocal pos
+        char = peek()
+        if char not in chars:
+            raise ValueError(f"JSON 格式错误：应为 {chars!r}，实际为 {char!r}")
+        pos += 1
+        return char
+
+    def value() -> Any:
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                result, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # 数字可能在块末尾被截断（如 "3." 会被解析为 3），其后没有非数字字符时读取更多内容重新解析
+            truncated = end == len(buf) or (isinstance(result, (int, float)) and buf[end] in NUMBER_CHARS)
+            if truncated and not eof:
+                fill()
+                continue
+            pos = end
+            return result
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = value()
+        expect(":")
+        if key in keys and peek() == "[":
+            expect("[")
+            if peek() == "]":
+                expect("]")
+            else:
+                while True:
+                    yield key, value()
+                    if expect(",]") == "]":
+                        break
+        else:
+            value()
+        if expect(",}") == "}":
+            return
+
+
+def iter_jsonl_items(file: TextIO) -> Iterator[tuple[str, Any]]:
+    """逐行解析 JSON Lines 文件：没有 "content" 的行视为头部（产出其中的标签和删除记录），其余每行一条摘录"""
+    for line in file:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if "content" in item:
+            yield "excerpts", item
+            continue
+        for key in IMPORT_KEYS[:-1]:
+            for value in item.get(key, []):
+                yield key, value
+
+
+def iter_import_file(path: str | Path) -> Iterator[tuple[str, Any]]:
+    """按后缀选择解析方式，流式产出导入文件中的 (IMPORT_KEYS 中的键, 元素)"""
+    with open(path, "r", encoding="utf-8") as file:
+        if str(path).endswith(".jsonl"):
+            yield from iter_jsonl_items(file)
+        else:
+            yield from iter_json_items(file)
+
+
 class DataExcerptTags(TableHelper):
     """摘录-标签关联类"""
-    __slots__ = ('cursor', 'name', 'columns', 'keys')
-    def __init__(self, cursor: sqlite3.Cursor):
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema')
+    # 按标签查询摘录（主键以 excerpt_cid 开头，无法用于 tag_cid 条件）
+    indexes = {"idx_excerpt_tags_tag_cid": ("tag_cid", "excerpt_cid")}
+    def __init__(self, cursor: sqlite3.Cursor, create: bool = True):
         columns = [('excerpt_cid', str), ('tag_cid', str)]
         super().__init__(cursor, "excerpt_tags", columns)
-        self.create_table()
+        if create:
+            self.create_table()
 
     def create_table(self) -> None:
         """创建摘录-标签关联表（多对多关系）"""
@@ -162,10 +320,30 @@ class DataExcerptTags(TableHelper):
         """更新摘录的标签（完全替换）"""
         if new_tags is None:  # 允许传入 None 表示不更新标签
             return
-        # 删除现有标签
-        self.delete("excerpt_cid = ?", (excerpt_cid,))
-        # 添加新标签
-        self.add_tags(excerpt_cid, new_tags)
+        self.set_tags_batch({excerpt_cid: new_tags})
+
+    def replace_tags_batch(self, records: list[ExcerptData]) -> None:
+        """批量完全替换多条摘录的标签，tag_cids 为 None 的摘录不更新"""
+        self.set_tags_batch({record.cid: record.tag_cids for record in records if record.tag_cids is not None})
+
+    def set_tags_batch(self, tags_map: dict[str, list[str]]) -> None:
+        """
+        将多条摘录的标签设置为 {excerpt_cid: [tag_cid, ...]}
+        一次查询取出这些摘录的现有标签，与新标签求差集，只删除多余的、插入缺少的关联，
+        标签没有变化的摘录不产生任何写入（也不会触发计数、变更记录的触发器）
+        """
+        if not tags_map:
+            return
+        current = self.get_tags_map(list(tags_map))
+        removed, added = [], []
+        for excerpt_cid, new_tags in tags_map.items():
+            old_tags, new_tags = set(current[excerpt_cid]), set(new_tags)
+            removed.extend((excerpt_cid, tag) for tag in old_tags - new_tags)
+            added.extend((excerpt_cid, tag) for tag in new_tags - old_tags)
+        if removed:
+            self.cursor.executemany(f"DELETE FROM {self.name} WHERE excerpt_cid = ? AND tag_cid = ?", removed)
+        if added:
+            self.cursor.executemany(self.get_insert_sql(['excerpt_cid', 'tag_cid'], 'IGNORE'), added)
 
     def get_tags(self, excerpt_cid: str) -> list[str]:
         """获取摘录的所有标签"""
@@ -173,6 +351,15 @@ class DataExcerptTags(TableHelper):
         results = self.query(sql, (excerpt_cid,))
         return [row['tag_cid'] for row in results]  # 直接返回字符串列表
 
+    def get_tags_map(self, excerpt_cids: list[str]) -> dict[str, list[str]]:
+        """批量获取多条摘录的标签，返回 {excerpt_cid: [tag_cid, ...]}"""
+        tags_map: dict[str, list[str]] = {cid: [] for cid in excerpt_cids}
+        if not excerpt_cids:
+            return tags_map
+        for excerpt_cid, tag_cid in self.select_in('excerpt_cid', excerpt_cids, ['excerpt_cid', 'tag_cid']):
+            tags_map[excerpt_cid].append(tag_cid)
+        return tags_map
+
     def get_excerpts_by_tag(self, tag_cid: str) -> list[str]:
         """获取使用指定标签的所有摘录ID"""
         sql = f"SELECT excerpt_cid FROM {self.name} WHERE tag_cid = ?"
@@ -202,19 +389,95 @@ class DataExcerptTags(TableHelper):
 
 
 
+class DataTagCounts(TableHelper):
+    """
+    标签摘录数量缓存表，由 excerpt_tags 上的触发器维护，使标签计数成为 O(1) 查询
+    依赖 tags 表（删除标签时清理计数），需在 DataTags 之后创建。
+    """
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema', 'excerpt_tags')
+    def __init__(self, cursor: sqlite3.Cursor, excerpt_tags: DataExcerptTags,
+                 tags_name: str = "tags", create: bool = True):
+        columns = [('tag_cid', str), ('excerpts_count', int)]
+        super().__init__(cursor, "tag_counts", columns)
+        self.excerpt_tags: DataExcerptTags = excerpt_tags
+        if not create:
+            return
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.name,))
+        exists = self.cursor.fetchone() is not None
+        self.create_table(tags_name)
+        # 旧数据库首次创建缓存表时，根据关联表统计
+        if not exists:
+            self.rebuild()
+
+    def create_table(self, tags_name: str) -> None:
+        """创建计数表及维护计数的触发器（关联表的增删，包括外键级联删除，都会触发）"""
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.name} (
+                tag_cid TEXT PRIMARY KEY,
+                excerpts_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        increase = (f"INSERT INTO {self.name} (tag_cid, excerpts_count) VALUES (new.tag_cid, 1) "
+                    f"ON CONFLICT(tag_cid) DO UPDATE SET excerpts_count = excerpts_count + 1;")
+        decrease = f"UPDATE {self.name} SET excerpts_count = excerpts_count - 1 WHERE tag_cid = old.tag_cid;"
+        triggers = {
+            "ai": f"AFTER INSERT ON {self.excerpt_tags.name} BEGIN {increase} END",
+            "ad": f"AFTER DELETE ON {self.excerpt_tags.name} BEGIN {decrease} END",
+            "au": f"AFTER UPDATE OF tag_cid ON {self.excerpt_tags.name} BEGIN {decrease} {increase} END",
+            "tags_ad": f"AFTER DELETE ON {tags_name} BEGIN DELETE FROM {self.name} WHERE tag_cid = old.cid; END",
+        }
+        for suffix, body in triggers.items():
+            self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {self.name}_{suffix} {body}")
+
+    def get_count(self, tag_cid: str) -> int:
+        """获取指定标签的摘录数量"""
+        self.cursor.execute(f"SELECT excerpts_count FROM {self.name} WHERE tag_cid = ?", (tag_cid,))
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+
+    def check(self) -> dict[str, tuple[int, int]]:
+        """
+        检查缓存与关联表是否一致
+        Returns:
+            不一致的标签 {tag_cid: (缓存数量, 实际数量)}，一致时为空字典
+        """
+        sql = f"""
+            SELECT tag_cid, SUM(cached), SUM(actual) FROM (
+                SELECT tag_cid, excerpts_count AS cached, 0 AS actual FROM {self.name}
+                UNION ALL
+                SELECT tag_cid, 0, COUNT(*) FROM {self.excerpt_tags.name} GROUP BY tag_cid
+            ) GROUP BY tag_cid HAVING SUM(cached) != SUM(actual)
+        """
+        self.cursor.execute(sql)
+        return {tag_cid: (cached, actual) for tag_cid, cached, actual in self.cursor.fetchall()}
+
+    def rebuild(self) -> None:
+        """根据关联表重新统计全部计数"""
+        self.cursor.execute(f"DELETE FROM {self.name}")
+        self.cursor.execute(f"""
+            INSERT INTO {self.name} (tag_cid, excerpts_count)
+            SELECT tag_cid, COUNT(*) FROM {self.excerpt_tags.name} GROUP BY tag_cid
+        """)
+
+
+
+
 class DataTags(IdTableHelper):
     """标签数据类"""
-    __slots__ = ('cursor', 'name', 'columns', 'keys', 'id_column', 'excerpt_tags')
-    def __init__(self, cursor: sqlite3.Cursor, excerpt_tags: DataExcerptTags):
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema', 'id_column', 'excerpt_tags', 'tag_counts', 'tags_cache')
+    def __init__(self, cursor: sqlite3.Cursor, excerpt_tags: DataExcerptTags, create: bool = True):
         columns = [('cid', str),
                 ('name', str),
                 ('color', str),
                 ('orders', int)]
         super().__init__(cursor, "tags", columns, "cid")
         self.excerpt_tags: DataExcerptTags = excerpt_tags
-        self.create_table()
-        if not self.item_count("cid", "default"):
-            self.add_or_update("default", '全部摘录')
+        self.tag_counts: Optional[DataTagCounts] = None # 计数缓存，为 None 时实时统计
+        self.tags_cache: Optional[dict[str, TagData]] = None # {cid: TagData} 缓存，写入标签表时失效
+        if create:
+            self.create_table()
+            if not self.item_count("cid", "default"):
+                self.add_or_update("default", '全部摘录')
     
     def create_table(self) -> None:
         """
@@ -247,6 +510,35 @@ class DataTags(IdTableHelper):
         """
         return TagData.from_dict_list(self.get_all(order_by = "orders"))
 
+    def get_all_with_counts(self) -> list[tuple[TagData, int]]:
+        """
+        一次查询获取所有标签及其摘录数量，按排序顺序返回
+        有计数缓存时直接读取缓存表，否则对关联表 GROUP BY 统计
+        Returns:
+            list[tuple[TagData, int]]: (标签, 摘录数量) 列表
+        """
+        if self.tag_counts:
+            sql = f"""
+                SELECT t.*, COALESCE(c.excerpts_count, 0) AS excerpts_count
+                FROM {self.name} AS t
+                LEFT JOIN {self.tag_counts.name} AS c ON c.tag_cid = t.cid
+                ORDER BY t.orders
+            """
+        else:
+            sql = f"""
+                SELECT t.*, COUNT(et.excerpt_cid) AS excerpts_count
+                FROM {self.name} AS t
+                LEFT JOIN {self.excerpt_tags.name} AS et ON et.tag_cid = t.cid
+                GROUP BY t.cid
+                ORDER BY t.orders
+            """
+        result = []
+        for row in self.query(sql):
+            count = row.pop("excerpts_count")
+            if (tag := TagData.from_dict(row)) is not None:
+                result.append((tag, count))
+        return result
+
     def get_item(self, cid: str) -> Optional[TagData]:
         """
         获取指定名称的标签数据
@@ -257,12 +549,54 @@ class DataTags(IdTableHelper):
         """
         return TagData.from_dict(self.get_line(cid))
 
+    def get_tags_dict(self) -> dict[str, TagData]:
+        """获取 {cid: TagData} 缓存，首次调用或缓存失效后从数据库加载全部标签"""
+        if self.tags_cache is None:
+            self.tags_cache = {tag.cid: tag for tag in self.get_all_by_order()}
+        return self.tags_cache
+
+    def get_cached(self, cid: str) -> Optional[TagData]:
+        """从缓存获取标签，未命中时重新加载一次（可能由其他连接新增）"""
+        tag = self.get_tags_dict().get(cid)
+        if tag is None:
+            self.invalidate_cache()
+            tag = self.get_tags_dict().get(cid)
+        return tag
+
+    def invalidate_cache(self) -> None:
+        """使标签缓存失效，下次读取时重新加载"""
+        self.tags_cache = None
+
+    # 所有写入操作都经过以下方法，写入后使缓存失效
+    # （add_or_update、update_order、delete_tag 以及导入时的批量 upsert）
+    def insert(self, records) -> None:
+        super().insert(records)
+        self.invalidate_cache()
+
+    def update(self, updates: dict, where: str, params: tuple = ()) -> None:
+        super().update(updates, where, params)
+        self.invalidate_cache()
+
+    def insert_or_update(self, records) -> None:
+        super().insert_or_update(records)
+        self.invalidate_cache()
+
+    def insert_or_update_upsert(self, records) -> None:
+        super().insert_or_update_upsert(records)
+        self.invalidate_cache()
+
+    def update_pairs(self, pairs: dict, other_column: str) -> None:
+        super().update_pairs(pairs, other_column)
+        self.invalidate_cache()
+
+    def delete(self, where: str, params: tuple = ()) -> None:
+        super().delete(where, params)
+        self.invalidate_cache()
+
     def get_tags(self, cids: list[str]) -> list[TagData]:
         if not cids:
             return []
-        placeholders = ','.join(['?'] * len(cids))
-        sql = f"SELECT * FROM {self.name} WHERE cid IN ({placeholders})"
-        tags = self.query(sql, tuple(cids))
+        tags = [dict(zip(self.keys, row)) for row in self.select_in('cid', cids)]
         return TagData.from_dict_list(tags)
 
     def update_order(self, cids: list[str]) -> None:
@@ -273,6 +607,23 @@ class DataTags(IdTableHelper):
         """添加或更新标签 """
         self.insert_or_update_upsert([TagData.new(cid, name, self.count()+1).to_dict()])
 
+    def ensure_names(self, names: Iterable[str]) -> dict[str, str]:
+        """
+        确保给定名称的标签都存在，缺少的标签一次 executemany 插入，排序接在现有最大 orders 之后
+        Returns:
+            dict[str, str]: 所有标签的 {名称: cid}（包括已有和新建的），导入时可直接复用
+        """
+        name_map = self.get_name_cid_map()
+        missing = [name for name in dict.fromkeys(names) if name and name not in name_map]
+        if not missing:
+            return name_map
+        self.cursor.execute(f"SELECT COALESCE(MAX(orders), 0) FROM {self.name}")
+        start = self.cursor.fetchone()[0] + 1
+        new_tags = [TagData.new(str(uuid.uuid4()), name, idx) for idx, name in enumerate(missing, start)]
+        self.insert([tag.to_dict() for tag in new_tags])
+        name_map.update((tag.name, tag.cid) for tag in new_tags)
+        return name_map
+
     def delete_tag(self, tag_cid: str) -> None:
         """删除标签并将关联摘录转移到默认标签"""
         if tag_cid == "default":
@@ -288,6 +639,8 @@ class DataTags(IdTableHelper):
 
     def get_excerpts_count(self, tag_cid: str) -> int:
         """获取使用指定标签的摘录数量"""
+        if self.tag_counts:
+            return self.tag_counts.get_count(tag_cid)
         return self.excerpt_tags.get_excerpts_count(tag_cid)
 
     def get_cid(self, name: str) -> str | None:
@@ -295,6 +648,13 @@ class DataTags(IdTableHelper):
         results = self.query(sql, (name,))
         return results[0]["cid"] if results else None
 
+    def get_name_cid_map(self) -> dict[str, str]:
+        """一次查询获取 {标签名称: cid}，名称重复时取最早创建的标签"""
+        name_map: dict[str, str] = {}
+        for name, cid in self.iter_query(f"SELECT name, cid FROM {self.name} ORDER BY rowid", row_type="tuple"):
+            name_map.setdefault(name, cid)
+        return name_map
+
     def search(self, keyword: str) -> list[TagData]:
         """进行模糊搜索"""
         if not keyword:
@@ -320,8 +680,16 @@ class DataTags(IdTableHelper):
 
 class DataExcerpts(IdTableHelper):
     """摘录数据类"""
-    __slots__ = ('cursor', 'name', 'columns', 'keys', 'id_column', 'excerpt_tags')
-    def __init__(self, cursor: sqlite3.Cursor, excerpt_tags: DataExcerptTags):
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema', 'id_column', 'excerpt_tags', 'tag_counts', 'fts_name', 'fts_enabled')
+    # 参与全文检索的列
+    fts_columns = ('content', 'title', 'author', 'note', 'source')
+    # 按作者、来源筛选及按创建时间排序/分页，均以 (created_at, cid) 结尾以支持 PAGE_ORDER
+    indexes = {
+        "idx_excerpts_author": ("author", "created_at", "cid"),
+        "idx_excerpts_source": ("source", "created_at", "cid"),
+        "idx_excerpts_created_at": ("created_at", "cid"),
+    }
+    def __init__(self, cursor: sqlite3.Cursor, excerpt_tags: DataExcerptTags, create: bool = True):
         columns = [('cid', str),
                 ('content', str),
                 ('source', str),
@@ -331,7 +699,16 @@ class DataExcerpts(IdTableHelper):
                 ('created_at', str)]
         super().__init__(cursor, "excerpts", columns, "cid")
         self.excerpt_tags: DataExcerptTags = excerpt_tags
-        self.create_table()
+        self.tag_counts: Optional[DataTagCounts] = None # 标签计数缓存，page_by_tag 据此选择查询方式
+        self.fts_name: str = f"{self.name}_fts"
+        self.fts_enabled: bool = False
+        if create:
+            self.create_table()
+            self.create_search_index()
+        else:
+            # 不建表时，以索引表是否存在判断是否启用全文索引
+            self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.fts_name,))
+            self.fts_enabled = self.cursor.fetchone() is not None
 
     def create_table(self) -> None:
         """
@@ -354,6 +731,54 @@ class DataExcerpts(IdTableHelper):
             )
         ''')
 
+    def create_search_index(self) -> None:
+        """
+        创建 FTS5 全文索引表（trigram 分词，适用于中文），并通过触发器与摘录表保持同步
+        索引表为外部内容表（content=excerpts），按 rowid 关联，不重复存储正文。
+        sqlite 不支持 FTS5 或 trigram 分词时，fts_enabled 为 False，搜索退回 LIKE。
+        """
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.fts_name,))
+        exists = self.cursor.fetchone() is not None
+        columns = ", ".join(self.fts_columns)
+        new_columns = ", ".join(f"new.{col}" for col in self.fts_columns)
+        old_columns = ", ".join(f"old.{col}" for col in self.fts_columns)
+        try:
+            self.cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_name} USING fts5(
+                    {columns}, content='{self.name}', content_rowid='rowid', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            self.fts_enabled = False
+            return
+        delete_old = (f"INSERT INTO {self.fts_name} ({self.fts_name}, rowid, {columns}) "
+                      f"VALUES ('delete', old.rowid, {old_columns});")
+        insert_new = f"INSERT INTO {self.fts_name} (rowid, {columns}) VALUES (new.rowid, {new_columns});"
+        triggers = {
+            "ai": f"AFTER INSERT ON {self.name} BEGIN {insert_new} END",
+            "ad": f"AFTER DELETE ON {self.name} BEGIN {delete_old} END",
+            "au": f"AFTER UPDATE ON {self.name} BEGIN {delete_old} {insert_new} END",
+        }
+        for suffix, body in triggers.items():
+            self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {self.fts_name}_{suffix} {body}")
+        self.fts_enabled = True
+        # 旧数据库首次创建索引时，为已有摘录建立索引
+        if not exists:
+            self.rebuild_search_index()
+
+    def rebuild_search_index(self) -> None:
+        """
+        根据摘录表重建全文索引
+        VACUUM 可能改变没有 INTEGER PRIMARY KEY 的表的 rowid，执行 VACUUM 后需要重建。
+        """
+        if self.fts_enabled:
+            self.cursor.execute(f"INSERT INTO {self.fts_name} ({self.fts_name}) VALUES ('rebuild')")
+
+    def delete_table(self):
+        # 先删除全文索引表，触发器随摘录表一起删除
+        self.cursor.execute(f'DROP TABLE IF EXISTS {self.fts_name}')
+        super().delete_table()
+
     def add_excerpt(self, content: str, source: str, title: str,
                         author: str, note: str, tag_cids: list[str]) -> str:
         """添加新摘录"""
@@ -400,9 +825,8 @@ class DataExcerpts(IdTableHelper):
             excerpts_data.append(data)
         # 2. 先 upsert 主表（确保每条摘录存在）
         self.insert_or_update_upsert(excerpts_data)
-        # 3. 再更新每条摘录的标签（删除旧的、插入新的）
-        for record in records:
-            self.excerpt_tags.update_tags(record.cid, record.tag_cids)
+        # 3. 再批量更新摘录的标签（删除旧的、插入新的）
+        self.excerpt_tags.replace_tags_batch(records)
 
     def get_with_tags(self, cid: str) -> Optional[ExcerptData]:
         """获取摘录及其标签"""
@@ -412,25 +836,76 @@ class DataExcerpts(IdTableHelper):
         excerpt["tag_cids"] = self.excerpt_tags.get_tags(cid)
         return ExcerptData.from_dict(excerpt)
 
-    def query_to_excerpt(self, excerpts: list[dict]) -> Optional[ExcerptData]:
+    def query_to_excerpt(self, excerpts: list[dict]) -> list[ExcerptData]:
+        """为查询结果补充标签（一次 IN 查询获取全部标签）"""
+        tags_map = self.excerpt_tags.get_tags_map([excerpt["cid"] for excerpt in excerpts])
         result = []
         for excerpt in excerpts:
-            excerpt["tag_cids"] = self.excerpt_tags.get_tags(excerpt["cid"])
+            excerpt["tag_cids"] = tags_map[excerpt["cid"]]
             result.append(ExcerptData.from_dict(excerpt))
         return result
 
+    def select_with_tags_sql(self, where: str = "", order_by: str = "", join: str = "", limit: int = 0) -> str:
+        """生成 select_with_tags 使用的查询语句，参数含义同 select_with_tags"""
+        sql = f"""
+            SELECT e.*, (
+                SELECT group_concat(t.tag_cid, char(31)) FROM {self.excerpt_tags.name} AS t
+                WHERE t.excerpt_cid = e.cid
+            ) AS tag_cids
+            FROM {self.name} AS e {join}
+        """
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql
+
+    @staticmethod
+    def row_to_excerpt(excerpt: dict) -> Optional[ExcerptData]:
+        """将 select_with_tags 查询的一行转换为 ExcerptData"""
+        tag_cids = excerpt["tag_cids"]
+        excerpt["tag_cids"] = tag_cids.split(TAG_CIDS_SEP) if tag_cids else []
+        return ExcerptData.from_dict(excerpt)
+
+    def select_with_tags(self, where: str = "", params: tuple = (), order_by: str = "",
+                         join: str = "", limit: int = 0) -> list[ExcerptData]:
+        """
+        单条语句获取摘录及其标签，标签通过 group_concat 子查询合并，避免逐条查询
+        Args:
+            where: WHERE子句
+            params: WHERE子句的参数
+            order_by: ORDER BY子句
+            join: 附加在摘录表（别名 e）之后的 JOIN 子句
+            limit: 返回的最大条数，0 表示不限制
+        """
+        sql = self.select_with_tags_sql(where, order_by, join, limit)
+        return [self.row_to_excerpt(excerpt) for excerpt in self.query(sql, params)]
+
+    def iter_with_tags(self, where: str = "", params: tuple = (), order_by: str = "",
+                       join: str = "", batch_size: int = 1000) -> Iterator[ExcerptData]:
+        """与 select_with_tags 相同，但逐条产出，内存占用与摘录总数无关（用于导出）"""
+        sql = self.select_with_tags_sql(where, order_by, join)
+        for excerpt in self.iter_query(sql, params, batch_size):
+            yield self.row_to_excerpt(excerpt)
+
     def get_excerpts(self, cids: list[str]) -> list[ExcerptData]:
-        """批量获取摘录"""
+        """批量获取摘录，数量较多时分块查询或通过临时表 JOIN（同 select_in）"""
         if not cids:
             return []
-        placeholders = ','.join(['?'] * len(cids))
-        sql = f"SELECT * FROM {self.name} WHERE cid IN ({placeholders})"
-        excerpts = self.query(sql, tuple(cids))
-        return self.query_to_excerpt(excerpts)
+        if len(cids) > TEMP_KEYS_THRESHOLD:
+            with self.temp_keys([(cid,) for cid in cids]) as temp_table:
+                return self.select_with_tags(join=f"JOIN {temp_table} AS k ON k.k0 = e.cid")
+        excerpts = []
+        for chunk in iter_chunks(cids, IN_CHUNK_VARIABLES):
+            placeholders = ','.join(['?'] * len(chunk))
+            excerpts += self.select_with_tags(f"e.cid IN ({placeholders})", tuple(chunk))
+        return excerpts
 
     def get_all_excerpts(self) -> list[ExcerptData]:
         """批量获取摘录"""
-        return self.query_to_excerpt(self.get_all())
+        return self.select_with_tags()
 
     def delete_excerpt(self, cid: str):
         '''删除摘录及其所有标签关联'''
@@ -439,73 +914,255 @@ class DataExcerpts(IdTableHelper):
 
     def get_by_author(self, author: str) -> list[ExcerptData]:
         """获取指定作者的所有摘录"""
-        sql = f"SELECT * FROM {self.name} WHERE author = ?"
-        excerpts = self.query(sql, (author,))
-        return self.query_to_excerpt(excerpts)
+        return self.select_with_tags("author = ?", (author,))
 
     def get_by_source(self, source: str) -> list[ExcerptData]:
         """获取指定来源的所有摘录"""
-        sql = f"SELECT * FROM {self.name} WHERE source = ?"
-        excerpts = self.query(sql, (source,))
-        return self.query_to_excerpt(excerpts)
+        return self.select_with_tags("source = ?", (source,))
 
-    def search(self, keyword: str) -> list[ExcerptData]:
-        """在标题、来源、作者、相关、正文进行模糊搜索"""
-        if not keyword:
-            return []
+    def select_page(self, cursor: Optional[str] = None, limit: int = 20, where: str = "",
+                    params: tuple = (), join: str = "") -> tuple[list[ExcerptData], Optional[str]]:
+        """
+        按 (created_at, cid) 倒序进行键集分页，每页只查询 limit + 1 条
+        Args:
+            cursor: 上一页返回的游标，None 表示第一页
+            limit: 每页数量，至少为 1
+            where: 额外的WHERE子句
+            params: WHERE子句的参数
+            join: 附加在摘录表（别名 e）之后的 JOIN 子句
+        Returns:
+            (本页摘录, 下一页游标)，没有下一页时游标为 None
+        """
+        if limit < 1:
+            raise ValueError(f"limit must be at least 1, got {limit}")
+        clauses = [f"({where})"] if where else []
+        params = tuple(params)
+        if cursor:
+            clauses.append("(e.created_at, e.cid) < (?, ?)")
+            params += decode_cursor(cursor)
+        excerpts = self.select_with_tags(" AND ".join(clauses), params, PAGE_ORDER, join, limit + 1)
+        if len(excerpts) > limit:
+            excerpts = excerpts[:limit]
+            return excerpts, encode_cursor(excerpts[-1])
+        return excerpts, None
+
+    def page_all_excerpts(self, cursor: Optional[str] = None, limit: int = 20) -> tuple[list[ExcerptData], Optional[str]]:
+        """分页获取所有摘录"""
+        return self.select_page(cursor, limit)
+
+    def page_by_tag(self, tag_cid: str, cursor: Optional[str] = None,
+                    limit: int = 20) -> tuple[list[ExcerptData], Optional[str]]:
+        """
+        分页获取使用指定标签的摘录，两种查询方式结果和游标相同：
+        - 按 idx_excerpts_created_at 顺序遍历摘录，逐条检查是否带有该标签，取够一页即停止，
+          约检查 limit * 摘录总数 / 标签摘录数 条，适合摘录较多的标签（如 default）
+        - 通过 idx_excerpt_tags_tag_cid 取出该标签的全部摘录再排序（USE TEMP B-TREE FOR ORDER BY），
+          每页的开销与标签摘录数成正比，适合摘录较少的标签
+        有标签计数缓存时按预计检查的行数选择，否则总是使用第二种
+        """
+        if self.tag_counts and self.walk_by_created_at(tag_cid, limit):
+            where = (f"EXISTS (SELECT 1 FROM {self.excerpt_tags.name} AS et "
+                     f"WHERE et.excerpt_cid = e.cid AND et.tag_cid = ?)")
+            return self.select_page(cursor, limit, where, (tag_cid,))
+        join = f"JOIN {self.excerpt_tags.name} AS et ON et.excerpt_cid = e.cid"
+        return self.select_page(cursor, limit, "et.tag_cid = ?", (tag_cid,), join)
+
+    def walk_by_created_at(self, tag_cid: str, limit: int) -> bool:
+        """按创建时间遍历预计检查的行数（limit * 总数 / 标签摘录数）不超过排序的行数（标签摘录数）时返回 True"""
+        count = self.tag_counts.get_count(tag_cid)
+        total = self.tag_counts.get_count("default")  # 每条摘录都带有 default 标签
+        return count * count >= limit * total
+
+    def page_by_author(self, author: str, cursor: Optional[str] = None,
+                       limit: int = 20) -> tuple[list[ExcerptData], Optional[str]]:
+        """分页获取指定作者的摘录"""
+        return self.select_page(cursor, limit, "e.author = ?", (author,))
+
+    def page_by_source(self, source: str, cursor: Optional[str] = None,
+                       limit: int = 20) -> tuple[list[ExcerptData], Optional[str]]:
+        """分页获取指定来源的摘录"""
+        return self.select_page(cursor, limit, "e.source = ?", (source,))
+
+    def page_search(self, keyword: str, cursor: Optional[str] = None,
+                    limit: int = 20) -> tuple[list[ExcerptData], Optional[str]]:
+        """分页搜索摘录，结果按创建时间倒序（而非 bm25 相关度）排列"""
+        if not keyword.strip():
+            return [], None
+        where, params, join = self._search_clauses(keyword)
+        return self.select_page(cursor, limit, where, params, join)
+
+    def _search_clauses(self, keyword: str) -> tuple[str, tuple, str]:
+        """
+        生成搜索的 WHERE 子句、参数和 JOIN 子句
+        启用全文索引时，长度不少于 3 的关键词走 FTS5 MATCH，
+        更短的关键词（trigram 无法索引）以 LIKE 条件附加；否则全部使用 LIKE 模糊搜索。
+        """
         # 空格分割关键词
         parts = [p.strip() for p in keyword.split() if p.strip()]
+        match_parts = [p for p in parts if len(p) >= 3] if self.fts_enabled else []
+        like_parts = [p for p in parts if p not in match_parts]
         # 生成 LIKE 语句
         like_clauses = []
         params = []
-        for p in parts:
-            like_clauses.append("""
-                (content LIKE ? OR
-                title   LIKE ? OR
-                author  LIKE ? OR
-                note  LIKE ? OR
-                source  LIKE ?)
-            """)
-            like_param = f"%{p}%"
-            params.extend([like_param] * 5)
-        where_sql = " AND ".join(like_clauses)
-        sql = f"""
-            SELECT * FROM {self.name}
-            WHERE {where_sql}
-            ORDER BY created_at DESC
-        """
-        excerpts = self.query(sql, tuple(params))
-        return self.query_to_excerpt(excerpts)
+        for p in like_parts:
+            like_clauses.append("(" + " OR ".join(f"e.{col} LIKE ?" for col in self.fts_columns) + ")")
+            params.extend([f"%{p}%"] * len(self.fts_columns))
+        if not match_parts:
+            return " AND ".join(like_clauses), tuple(params), ""
+        # 每个关键词作为一个短语，短语之间为 AND 关系
+        match_query = " ".join('"{}"'.format(p.replace('"', '""')) for p in match_parts)
+        where_sql = " AND ".join([f"{self.fts_name} MATCH ?"] + like_clauses)
+        join = f"JOIN {self.fts_name} ON {self.fts_name}.rowid = e.rowid"
+        return where_sql, (match_query, *params), join
 
+    def search(self, keyword: str) -> list[ExcerptData]:
+        """在标题、来源、作者、相关、正文进行搜索，使用全文索引时按 bm25 相关度排序"""
+        if not keyword.strip():
+            return []
+        where, params, join = self._search_clauses(keyword)
+        order_by = f"bm25({self.fts_name})" if join else "created_at DESC"
+        return self.select_with_tags(where, params, order_by, join)
 
 
 
+
+class DataChangeLog(TableHelper):
+    """
+    变更记录表，由 excerpts、excerpt_tags、tags 上的触发器维护，用于差异备份
+    每个 (kind, cid) 只保留最近一次变更，seq 单调递增（AUTOINCREMENT），表的大小不超过变更过的记录数。
+    只记录“哪条记录变了”，导出时按当前是否存在决定写出记录还是删除，重复应用结果相同。
+    需在摘录表之后创建。
+    """
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema')
+    def __init__(self, cursor: sqlite3.Cursor, excerpts_name: str = "excerpts",
+                 excerpt_tags_name: str = "excerpt_tags", tags_name: str = "tags", create: bool = True):
+        columns = [('seq', int), ('kind', str), ('cid', str)]
+        super().__init__(cursor, "changelog", columns)
+        if create:
+            self.create_table(excerpts_name, excerpt_tags_name, tags_name)
+
+    def create_table(self, excerpts_name: str, excerpt_tags_name: str, tags_name: str) -> None:
+        """创建变更记录表及触发器（包括外键级联删除引起的变更）"""
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.name} (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                cid TEXT NOT NULL,
+                UNIQUE (kind, cid)
+            )
+        """)
+        # 触发器中的 INSERT OR REPLACE 会被外层语句（如 UPSERT）的冲突处理覆盖，因此先删除再插入
+        def log(kind: str, cid: str) -> str:
+            return (f"DELETE FROM {self.name} WHERE kind = '{kind}' AND cid = {cid}; "
+                    f"INSERT INTO {self.name} (kind, cid) VALUES ('{kind}', {cid});")
+        sources = {
+            "excerpts": (excerpts_name, "excerpt", "cid"),
+            "excerpt_tags": (excerpt_tags_name, "excerpt", "excerpt_cid"),  # 标签关联的变化记为摘录的变化
+            "tags": (tags_name, "tag", "cid"),
+        }
+        for prefix, (table, kind, column) in sources.items():
+            triggers = {
+                "ai": f"AFTER INSERT ON {table} BEGIN {log(kind, f'new.{column}')} END",
+                "ad": f"AFTER DELETE ON {table} BEGIN {log(kind, f'old.{column}')} END",
+                "au": f"AFTER UPDATE ON {table} BEGIN {log(kind, f'old.{column}')} {log(kind, f'new.{column}')} END",
+            }
+            for suffix, body in triggers.items():
+                self.cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {self.name}_{prefix}_{suffix} {body}")
+
+    def watermark(self) -> int:
+        """当前最大的变更序号，下次差异导出从这里开始"""
+        self.cursor.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {self.name}")
+        return self.cursor.fetchone()[0]
+
+    def changed_sql(self, kind: str) -> str:
+        """变更过的 cid 子查询，参数为起始序号"""
+        return f"SELECT cid FROM {self.name} WHERE kind = '{kind}' AND seq > ?"
+
+    def get_deleted(self, kind: str, table: str, since: int) -> list[str]:
+        """since 之后变更过、当前已不存在的 cid"""
+        sql = f"{self.changed_sql(kind)} AND cid NOT IN (SELECT cid FROM {table})"
+        self.cursor.execute(sql, (since,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+
 class SqlDataManager(SqlbaseHelper):
     """
     数据库管理器类，用于处理标签和摘录数据的存储与检索
     """
+    cache_tag_counts: bool = True # 是否使用触发器维护的标签计数缓存表
+    track_changes: bool = True # 是否使用触发器维护的变更记录表（差异备份）
+    _schema_ready: set[str] = set() # 本进程中已完成建表的数据库路径，attach 模式据此跳过建表
     def init_database(self) -> None:
-        """初始化数据库连接和表结构"""
+        """
+        初始化数据库连接和表结构
+        attach 模式下若该数据库已建表、或以只读配置打开时，只创建表助手，不执行建表语句
+        """
         super().init_database()
+        db_key = str(self.db_path)
+        ready = db_key in self._schema_ready
+        create = not self.profile.read_only and not (self.attach and ready)
         # 创建中间表
-        excerpt_tags = DataExcerptTags(self.cursor)
+        excerpt_tags = DataExcerptTags(self.cursor, create)
         self.add_table_helper(excerpt_tags)
         # 创建标签表
-        tags = DataTags(self.cursor, excerpt_tags)
+        tags = DataTags(self.cursor, excerpt_tags, create)
         self.add_table_helper(tags)
+        # 创建标签计数缓存表
+        if self.cache_tag_counts and (create or ready or self.has_table("tag_counts")):
+            tags.tag_counts = DataTagCounts(self.cursor, excerpt_tags, tags.name, create)
+            self.add_table_helper(tags.tag_counts)
+        elif create:
+            # 关闭后删除缓存表及其触发器，否则触发器仍会维护计数；重新开启时按关联表重新统计
+            self.drop_trigger_table("tag_counts")
         # 创建摘录表
-        excerpts = DataExcerpts(self.cursor, excerpt_tags)
+        excerpts = DataExcerpts(self.cursor, excerpt_tags, create)
+        excerpts.tag_counts = tags.tag_counts
         self.add_table_helper(excerpts)
-        self.conn.commit()
+        # 创建变更记录表
+        if self.track_changes and (create or ready or self.has_table("changelog")):
+            self.add_table_helper(DataChangeLog(self.cursor, excerpts.name, excerpt_tags.name, tags.name, create))
+        elif create:
+            self.drop_trigger_table("changelog")
+        if create:
+            # 创建（或为已有数据库补建）索引
+            for table in self.table_helpers.values():
+                table.create_indexes()
+            self.conn.commit()
+            self._schema_ready.add(db_key)
     
+    def has_table(self, name: str) -> bool:
+        """数据库中是否存在指定的表"""
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return self.cursor.fetchone() is not None
+
+    def drop_trigger_table(self, name: str) -> None:
+        """删除由触发器维护的表及其触发器（触发器名均以 "表名_" 开头）"""
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ? ESCAPE '\\'",
+                            (name.replace("_", "\\_") + "\\_%",))
+        for trigger, in self.cursor.fetchall():
+            self.cursor.execute(f"DROP TRIGGER IF EXISTS [{trigger}]")
+        self.cursor.execute(f"DROP TABLE IF EXISTS [{name}]")
+
     def get_tags_helper(self) -> DataTags:
         return self.table_helpers["tags"]
     
     def get_excerpts_helper(self) -> DataExcerpts:
         return self.table_helpers["excerpts"]
 
+    def get_changelog_helper(self) -> Optional[DataChangeLog]:
+        return self.table_helpers.get("changelog")
+
     def get_tag(self, tag_id: str) -> Optional[TagData]:
-        return self.get_tags_helper().get_item(tag_id)
+        """从标签缓存中获取标签（卡片绘制等高频调用）"""
+        return self.get_tags_helper().get_cached(tag_id)
+
+    def get_tags_dict(self) -> dict[str, TagData]:
+        """获取 {cid: TagData} 标签缓存"""
+        return self.get_tags_helper().get_tags_dict()
+
+    def invalidate_tag_cache(self) -> None:
+        """其他连接修改标签后调用，使标签缓存失效"""
+        self.get_tags_helper().invalidate_cache()
 
     def get_excerpt(self, excerpt_id: str) -> Optional[ExcerptData]:
         result = self.get_excerpts_helper().get_excerpts([excerpt_id])
@@ -518,14 +1175,100 @@ class SqlDataManager(SqlbaseHelper):
 
     def get_all_tags(self) -> list[TagData]:
         return self.get_tags_helper().get_all_by_order()
+
+    def export_json(self, path: str | Path, fmt: str = "json", batch_size: int = 1000,
+                    progress: Optional[Callable[[int], None]] = None, since: Optional[int] = None) -> int:
+        """
+        流式导出全部标签和摘录，摘录逐条读取、逐条写入，内存占用与摘录总数无关
+        先写入临时文件，完成后再替换目标文件
+        Args:
+            path: 导出文件路径
+            fmt: "json" 为 {"export_date", "tags", "excerpts"} 对象；
+                 "jsonl" 第一行为 {"export_date", "tags"}，之后每行一条摘录
+            batch_size: 每次从数据库读取的条数，也是 progress 的调用间隔
+            progress: 以已导出的条数调用
+            since: 差异导出，只导出变更序号大于 since 的标签和摘录，并在头部写入
+                   "deleted_tags"、"deleted_excerpts"；用 import_json 应用到备份库
+        头部的 "watermark" 为导出开始时的变更序号，作为下次差异导出的 since
+        Returns:
+            int: 导出的摘录条数
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        changelog = self.get_changelog_helper()
+        if since is not None and changelog is None:
+            raise ValueError("数据库没有变更记录表，不能差异导出")
+        tags_helper = self.get_tags_helper()
+        excerpts_helper = self.get_excerpts_helper()
+        header = {"export_date": datetime.now().isoformat()}
+        if changelog:
+            # 先读取序号再读取数据，导出期间的新变更最多在下次重复导出，不会遗漏
+            header["watermark"] = changelog.watermark()
+        if since is None:
+            header["tags"] = [tag.to_dict() for tag in self.get_all_tags()]
+            excerpts = excerpts_helper.iter_with_tags(order_by=PAGE_ORDER, batch_size=batch_size)
+        else:
+            header["since"] = since
+            sql = f"SELECT * FROM {tags_helper.name} WHERE cid IN ({changelog.changed_sql('tag')}) ORDER BY orders"
+            header["tags"] = [tag.to_dict() for tag in TagData.from_dict_list(tags_helper.query(sql, (since,)))]
+            header["deleted_tags"] = changelog.get_deleted("tag", tags_helper.name, since)
+            header["deleted_excerpts"] = changelog.get_deleted("excerpt", excerpts_helper.name, since)
+            excerpts = excerpts_helper.iter_with_tags(f"e.cid IN ({changelog.changed_sql('excerpt')})", (since,),
+                                                      order_by=PAGE_ORDER, batch_size=batch_size)
+        temp_path = Path(f"{path}.tmp")
+        count = 0
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                if fmt == "jsonl":
+                    f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                    first, rest, end = "{}\n", "{}\n", ""
+                else:
+                    # 去掉 header 末尾的 "\n}"，接着写入 excerpts 数组
+                    f.write(json.dumps(header, ensure_ascii=False, indent=2)[:-2] + ',\n  "excerpts": [')
+                    first, rest, end = "\n    {}", ",\n    {}", "\n  ]\n}\n"
+                for excerpt in excerpts:
+                    f.write((rest if count else first).format(json.dumps(excerpt.to_dict(), ensure_ascii=False)))
+                    count += 1
+                    if progress and count % batch_size == 0:
+                        progress(count)
+                f.write(end)
+            os.replace(temp_path, path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        if progress:
+            progress(count)
+        return count
+
+    def get_all_tags_with_counts(self) -> list[tuple[TagData, int]]:
+        return self.get_tags_helper().get_all_with_counts()
+
+    def check_tag_counts(self, repair: bool = True) -> dict[str, tuple[int, int]]:
+        """
+        检查标签计数缓存，返回不一致的标签 {tag_cid: (缓存数量, 实际数量)}
+        repair 为 True 且存在不一致时重建缓存
+        """
+        tag_counts = self.get_tags_helper().tag_counts
+        if not tag_counts:
+            return {}
+        mismatches = tag_counts.check()
+        if mismatches and repair:
+            tag_counts.rebuild()
+            self.conn.commit()
+        return mismatches
     
-    def get_all_excerpts(self) -> list[TagData]:
+    def get_all_excerpts(self) -> list[ExcerptData]:
         return self.get_excerpts_helper().get_all_excerpts()
 
+    def rebuild_search_index(self) -> None:
+        """重建摘录全文索引"""
+        self.get_excerpts_helper().rebuild_search_index()
+        self.conn.commit()
+
     def reset_data(self) -> None:
         for table in self.table_helpers.values():
             table.delete_table()
         self.conn.commit()
+        self._schema_ready.discard(str(self.db_path))
         self.init_database()
 
     def update_excerpt(self, new: ExcerptData, old: ExcerptData = None) -> ExcerptData:
@@ -542,20 +1285,138 @@ class SqlDataManager(SqlbaseHelper):
         self.get_excerpts_helper().insert_or_update_excerpts(records)
         self.conn.commit()
     
-    def insert_tags_names(self, tags: list[str]) -> None:
-        tag_names = set([tag.name for tag in self.get_tags_helper().get_all_by_order()])
-        for tag in tags:
-            if tag in tag_names:
-                continue
-            self.get_tags_helper().add_or_update(uuid.uuid4(), tag)
-            tag_names.add(tag)
+    def insert_tags_names(self, tags: Iterable[str]) -> dict[str, str]:
+        """按名称批量创建缺少的标签，返回所有标签的 {名称: cid}"""
+        name_map = self.get_tags_helper().ensure_names(tags)
         self.conn.commit()
+        return name_map
     
-    def insert_excerpts_dict(self, excerpts: list[dict]) -> None:
-        for excerpt in excerpts:
-            tags = excerpt.pop("tags")
-            excerpt["tag_cids"] = [self.get_tags_helper().get_cid(tag) for tag in tags]
-        self.insert_excerpts(ExcerptData.from_dict_list(excerpts))
+    def insert_excerpts_dict(self, excerpts: Iterable[dict],
+                             name_map: Optional[dict[str, str]] = None) -> ImportStats:
+        """插入摘录字典（"tags" 为标签名称列表），见 bulk_insert_excerpts_dict"""
+        return self.bulk_insert_excerpts_dict(excerpts, name_map = name_map)
+
+    def bulk_insert_excerpts_dict(self, excerpts: Iterable[dict], batch_size: int = 5000,
+                                  defer_indexes: bool = False,
+                                  progress: Optional[Callable[[int], None]] = None,
+                                  name_map: Optional[dict[str, str]] = None) -> ImportStats:
+        """
+        批量导入摘录字典，整个导入在一个事务中完成，失败时全部回滚
+        - 摘录中的 "tags"（标签名称列表）通过一次查询全部解析为 cid，不存在的标签名称被忽略；
+          没有 "tags" 时使用 "tag_cids"
+        - 每批摘录和标签关联各用一次 executemany 写入
+        Args:
+            excerpts: 摘录字典，可以是生成器
+            batch_size: 每批条数
+            defer_indexes: 导入前删除二级索引，导入后统一重建（大量导入时更快）
+            progress: 每写入一批后以已导入的条数调用
+            name_map: {标签名称: cid}，通常为 insert_tags_names 的返回值；为空时查询一次
+        Returns:
+            ImportStats: 导入条数与速度
+        """
+        start = time.perf_counter()
+        if name_map is None:
+            name_map = self.get_tags_helper().get_name_cid_map()
+        excerpts_helper = self.get_excerpts_helper()
+        deferred = (excerpts_helper, excerpts_helper.excerpt_tags) if defer_indexes else ()
+        stats = ImportStats()
+        try:
+            for helper in deferred:
+                helper.drop_indexes()
+            for batch in iter_chunks(excerpts, batch_size):
+                records = [record for excerpt in batch
+                           if (record := excerpt_from_dict(excerpt, name_map)) is not None]
+                excerpts_helper.insert_or_update_excerpts(records)
+                stats.rows += len(records)
+                if progress:
+                    progress(stats.rows)
+            for helper in deferred:
+                helper.create_indexes()
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def import_json(self, path: str | Path, batch_size: int = 1000, skip_errors: bool = False,
+                    progress: Optional[Callable[[int], None]] = None) -> ImportStats:
+        """
+        流式导入 JSON / JSON Lines 文件（export_json 导出的文件，或 parse_quotes_file_tool 生成的文件）
+        - 文件增量解析，按 batch_size 条批量 upsert，内存占用与文件大小无关
+        - 整个导入在一个事务中完成，外键检查推迟到提交时，标签和摘录的先后顺序不限
+        - 标签可以是标签字典，也可以是标签名称（不存在时新建）；摘录可以用 "tags"（名称）或 "tag_cids" 指定标签
+        - 差异导出文件中的 "deleted_tags"、"deleted_excerpts" 会被删除（默认标签除外）
+        Args:
+            path: 导入文件，.jsonl 后缀按 JSON Lines 解析
+            batch_size: 每批条数
+            skip_errors: 为 True 时每批使用一个保存点，出错的批次回滚到保存点后跳过，
+                提交前删除引用不存在标签的关联；否则出错时整个导入回滚
+                （FTS5 在每个保存点都会写出待合并的索引，保存点会明显拖慢大量导入，因此只在需要时使用）
+            progress: 每写入一批后以已导入的条数调用
+        Returns:
+            ImportStats: 导入的摘录条数、跳过的条数与速度
+        """
+        start = time.perf_counter()
+        tags_helper = self.get_tags_helper()
+        excerpts_helper = self.get_excerpts_helper()
+        name_map = tags_helper.get_name_cid_map()
+        stats = ImportStats()
+
+        def write_batch(key: str, items: list) -> int:
+            if key == "deleted_excerpts":
+                self.cursor.executemany(f"DELETE FROM {excerpts_helper.name} WHERE cid = ?",
+                                        [(cid,) for cid in items])
+                return 0
+            if key == "deleted_tags":
+                self.cursor.executemany(f"DELETE FROM {tags_helper.name} WHERE cid = ? AND cid != 'default'",
+                                        [(cid,) for cid in items])
+                return 0
+            if key == "excerpts":
+                records = [record for item in items if (record := excerpt_from_dict(item, name_map)) is not None]
+                excerpts_helper.insert_or_update_excerpts(records)
+                return len(records)
+            names = [item for item in items if isinstance(item, str)]
+            if names:
+                name_map.update(tags_helper.ensure_names(names))
+            tags = [{**TagData.default().to_dict(), **{k: item[k] for k in TAG_FIELDS if k in item}}
+                    for item in items if isinstance(item, dict) and item.get("cid")]
+            tags_helper.insert_or_update_upsert(tags)
+            for tag in tags:
+                name_map.setdefault(tag["name"], tag["cid"])
+            return 0
+
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        try:
+            self.conn.execute("PRAGMA defer_foreign_keys = ON")
+            for key, group in itertools.groupby(iter_import_file(path), key=lambda event: event[0]):
+                for batch in iter_chunks((item for _, item in group), batch_size):
+                    if not skip_errors:
+                        stats.rows += write_batch(key, batch)
+                    else:
+                        self.conn.execute("SAVEPOINT import_batch")
+                        try:
+                            stats.rows += write_batch(key, batch)
+                        except (sqlite3.Error, ValueError, TypeError, KeyError):
+                            self.conn.execute("ROLLBACK TO import_batch")
+                            stats.skipped += len(batch)
+                        finally:
+                            self.conn.execute("RELEASE import_batch")
+                    if progress and key == "excerpts":
+                        progress(stats.rows)
+            if skip_errors:
+                links = excerpts_helper.excerpt_tags.name
+                orphans = self.conn.execute(f"PRAGMA foreign_key_check({links})").fetchall()
+                self.conn.executemany(f"DELETE FROM {links} WHERE rowid = ?", [(row[1],) for row in orphans])
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            tags_helper.invalidate_cache()
+        stats.seconds = time.perf_counter() - start
+        return stats
 
 
 def get_sql_path():
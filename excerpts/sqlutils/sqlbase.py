@@ -1,6 +1,8 @@
 import sqlite3
-from typing import Any, Iterable, Optional, Callable, Union
-import json, datetime, uuid
+from typing import Any, Iterable, Iterator, Optional, Callable, Sequence, Union
+import json, datetime, uuid, queue, threading
+from dataclasses import dataclass, field, replace
+from contextlib import contextmanager
 from pathlib import Path
 
 
@@ -48,6 +50,32 @@ def prepare_value(value: Any) -> Any:
     return value
 
 
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """将任意可迭代对象按 size 条切分为列表，最后一块可能不足 size 条"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# iter_query / iter_all 可产出的行类型
+ROW_TYPES = ("dict", "row", "tuple")
+
+# 需要的最低 sqlite 版本：INSERT ... ON CONFLICT DO UPDATE（UPSERT）从 3.24 起支持，
+# insert_or_update 以及标签计数、变更记录的触发器都依赖它
+MIN_SQLITE_VERSION = (3, 24, 0)
+
+# 按键批量查询（TableHelper.select_in）：
+# 每条 IN 查询最多使用的参数个数，低于 sqlite 3.32 之前 SQLITE_MAX_VARIABLE_NUMBER 的默认值 999
+IN_CHUNK_VARIABLES = 900
+# 单列键数超过该值时改为写入临时表再 JOIN，避免大量分块查询和超长 IN 列表的解析开销
+TEMP_KEYS_THRESHOLD = 20000
+
+
 COLUMN_TYPE_MAPPING = {
     float: "FLOAT",
     int: "INTEGER",
@@ -82,11 +110,30 @@ COLUMN_TYPE_MAPPING = {
 
 
 
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    从数据库读取的表结构（PRAGMA table_info / index_list），由 TableHelper.get_schema() 缓存
+    """
+    columns      : tuple[str, ...] = ()                         # 列名，按表定义顺序
+    types        : dict[str, str] = field(default_factory=dict) # 列名 -> 声明的类型
+    primary_keys : tuple[str, ...] = ()                         # 主键列，按主键中的顺序
+    not_null     : frozenset[str] = frozenset()                 # NOT NULL 约束的列
+    indexes      : tuple[str, ...] = ()                         # 已存在的索引名（包括主键等自动索引）
+
+    @property
+    def exists(self) -> bool:
+        """数据库中是否存在该表"""
+        return bool(self.columns)
+
+
 class TableHelper:
     """
     封装了SQLite3的游标，提供了一些常用的方法。
     """
-    __slots__ = ('cursor', 'name', 'columns', 'keys')
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema')
+    # 表的二级索引声明：索引名 -> 列名，由 create_indexes() 创建，子类按需覆盖
+    indexes: dict[str, tuple[str, ...]] = {}
     def __init__(self, cursor: sqlite3.Cursor, name: str, columns: list[tuple[str, str]]):
         '''
         :param name: 表名
@@ -96,6 +143,44 @@ class TableHelper:
         self.name: str = name
         self.columns: list[tuple[str, str]] = columns
         self.keys = [c[0] for c in columns]
+        # 生成过的 SQL 语句：(操作, 列名元组, ...) -> SQL，相同的语句字符串可命中 sqlite3 的预编译语句缓存
+        self.sql_cache: dict[tuple, str] = {}
+        # 表结构缓存，第一次 get_schema() 时读取，DDL 后由 invalidate_schema() 清除
+        self.schema: Optional[TableSchema] = None
+
+    def get_schema(self) -> TableSchema:
+        """
+        获取表结构（主键、列类型、索引），每个连接只读取一次
+        表尚不存在时返回空结构且不缓存
+        """
+        if self.schema is not None:
+            return self.schema
+        self.cursor.execute(f"PRAGMA table_info([{self.name}])")
+        table_info = self.cursor.fetchall()
+        # row: (cid, name, type, notnull, dflt_value, pk)，pk 为列在主键中的序号（从 1 开始）
+        primary_keys = tuple(row[1] for row in sorted(table_info, key=lambda row: row[5]) if row[5] > 0)
+        self.cursor.execute(f"PRAGMA index_list([{self.name}])")
+        schema = TableSchema(
+            columns=tuple(row[1] for row in table_info),
+            types={row[1]: row[2] for row in table_info},
+            primary_keys=primary_keys,
+            not_null=frozenset(row[1] for row in table_info if row[3]),
+            indexes=tuple(row[1] for row in self.cursor.fetchall()),
+        )
+        if schema.exists:
+            self.schema = schema
+        return schema
+
+    def invalidate_schema(self) -> None:
+        """清除表结构缓存，对该表执行 DDL（建删表、索引，ALTER TABLE）后调用"""
+        self.schema = None
+
+    def cached_sql(self, key: tuple, build: Callable[[], str]) -> str:
+        """按 key 缓存 build() 生成的 SQL 语句"""
+        sql = self.sql_cache.get(key)
+        if sql is None:
+            sql = self.sql_cache[key] = build()
+        return sql
 
     def item_count(self, column, value):
         self.cursor.execute(f"SELECT COUNT(*) FROM [{self.name}] WHERE [{column}] = ?", (value,))
@@ -108,10 +193,20 @@ class TableHelper:
 
     def get_insert_sql(self, keys: list[str], util: str = "") -> str:
         '''生成插入语句'''
-        placeholders = ", ".join(["?"] * len(keys))
-        columns_str = ", ".join([f"[{col}]" for col in keys])
-        util = f" OR {util}" if util else ""
-        return f"INSERT{util} INTO [{self.name}] ({columns_str}) VALUES ({placeholders})"
+        def build() -> str:
+            placeholders = ", ".join(["?"] * len(keys))
+            columns_str = ", ".join([f"[{col}]" for col in keys])
+            conflict = f" OR {util}" if util else ""
+            return f"INSERT{conflict} INTO [{self.name}] ({columns_str}) VALUES ({placeholders})"
+        return self.cached_sql(("insert", tuple(keys), util), build)
+
+    def get_update_sql(self, keys: Iterable[str], where: str) -> str:
+        '''生成 UPDATE 语句，SET 的参数在前，WHERE 的参数在后'''
+        keys = tuple(keys)
+        def build() -> str:
+            set_clause = ", ".join(f"[{col}] = ?" for col in keys)
+            return f"UPDATE [{self.name}] SET {set_clause} WHERE {where}"
+        return self.cached_sql(("update", keys, where), build)
 
     def insert(self, records: Union[dict[str, Any], Iterable[dict[str, Any]]]) -> None:
         '''插入一条或多条记录'''
@@ -135,16 +230,14 @@ class TableHelper:
         """
         self.validate_column_names(updates.keys())
         # ---- 获取主键列（支持复合主键）----
-        self.cursor.execute(f"PRAGMA table_info([{self.name}])")
-        pk_cols = [row[1] for row in self.cursor.fetchall() if row[5] > 0]
+        pk_cols = self.get_schema().primary_keys
         # ---- 禁止更新主键列 ----
         for pk in pk_cols:
             if pk in updates:
                 raise ValueError(f"Cannot update primary key column '{pk}'")
         # ---- 构建 SQL ----
-        set_clause = ", ".join(f"[{col}] = ?" for col in updates.keys())
         values = [prepare_value(v) for v in updates.values()]
-        sql = f"UPDATE [{self.name}] SET {set_clause} WHERE {where}"
+        sql = self.get_update_sql(updates.keys(), where)
         # ---- 执行 ----
         self.cursor.execute(sql, tuple(values) + params)
     
@@ -152,6 +245,7 @@ class TableHelper:
         """
         通用 insert_or_update，支持复合主键。
         要求：主键列必须在表定义中声明过。
+        以 ``INSERT ... ON CONFLICT(主键) DO UPDATE`` 一次 executemany 完成。
         """
         # --- 规范化 records ---
         if isinstance(records, dict):
@@ -160,10 +254,7 @@ class TableHelper:
         if not records:
             return
         # --- 找到表的主键列 ---
-        # 需要 cursor.execute("PRAGMA table_info(table)")
-        self.cursor.execute(f"PRAGMA table_info([{self.name}])")
-        table_info = self.cursor.fetchall()
-        pk_cols = [row[1] for row in table_info if row[5] > 0]  # row[5] = pk flag
+        pk_cols = list(self.get_schema().primary_keys)
         if not pk_cols:
             raise ValueError(f"Table '{self.name}' has no primary key; cannot use insert_or_update()")
         # --- 验证 pk 存在于记录中 ---
@@ -174,54 +265,77 @@ class TableHelper:
         # --- 准备字段列表 ---
         cols = list(records[0].keys())
         self.validate_column_names(cols)
-        # --- 查询数据库中已存在的主键组合 ---
-        # 提取主键值元组
-        pk_value_list = [
-            tuple(prepare_value(rec[pk]) for pk in pk_cols)
-            for rec in records
-        ]
-        # 构建 WHERE pk IN ((?,?),(?,?)) 形式的查询
-        placeholders = ",".join(
-            "(" + ",".join("?" for _ in pk_cols) + ")"
-            for _ in pk_value_list
-        )
-        flat_params = [v for tpl in pk_value_list for v in tpl]
-        sql = (
-            f"SELECT {', '.join(f'[{pk}]' for pk in pk_cols)} "
-            f"FROM [{self.name}] "
-            f"WHERE ({', '.join(f'[{pk}]' for pk in pk_cols)}) IN ({placeholders})"
-        )
-        self.cursor.execute(sql, flat_params)
-        existing_pk_set = {tuple(row) for row in self.cursor.fetchall()}
-        # --- 分成需要 insert 的和需要 update 的 ---
-        inserts = []
-        updates = []
-        for rec in records:
-            pk_tuple = tuple(prepare_value(rec[pk]) for pk in pk_cols)
-            if pk_tuple in existing_pk_set:
-                updates.append(rec)
-            else:
-                inserts.append(rec)
-        # --- 执行插入 ---
-        if inserts:
-            insert_data = [
-                tuple(prepare_value(rec[col]) for col in cols)
-                for rec in inserts
-            ]
-            self.cursor.executemany(self.get_insert_sql(cols), insert_data)
-        # --- 执行更新（逐条更新） ---
-        if updates:
-            set_clause = ", ".join(f"[{col}] = ?" for col in cols if col not in pk_cols)
-            if set_clause:  # 若只有主键列，则无需更新
-                update_cols = [col for col in cols if col not in pk_cols]
-                for rec in updates:
-                    update_values = [prepare_value(rec[col]) for col in update_cols]
-                    pk_values = [prepare_value(rec[pk]) for pk in pk_cols]
-                    sql = (
-                        f"UPDATE [{self.name}] SET {set_clause} "
-                        f"WHERE " + " AND ".join(f"[{pk}] = ?" for pk in pk_cols)
-                    )
-                    self.cursor.execute(sql, tuple(update_values + pk_values))
+        # --- UPSERT：插入与更新在同一语句中完成 ---
+        def build() -> str:
+            update_cols = [col for col in cols if col not in pk_cols]
+            conflict = ", ".join(f"[{pk}]" for pk in pk_cols)
+            if not update_cols:  # 若只有主键列，则已存在时无需更新
+                return f"{self.get_insert_sql(cols)} ON CONFLICT({conflict}) DO NOTHING"
+            set_clause = ", ".join(f"[{col}] = excluded.[{col}]" for col in update_cols)
+            return f"{self.get_insert_sql(cols)} ON CONFLICT({conflict}) DO UPDATE SET {set_clause}"
+        data = [tuple(prepare_value(rec[col]) for col in cols) for rec in records]
+        self.cursor.executemany(self.cached_sql(("upsert", tuple(cols), tuple(pk_cols)), build), data)
+
+    def select_in(self, key_columns: Union[str, Sequence[str]], keys: Iterable[Any],
+                  columns: Optional[Sequence[str]] = None) -> list[tuple]:
+        """
+        按一组键批量查询，相当于 ``SELECT columns FROM 表 WHERE (key_columns) IN (keys)``
+        单列键按 IN_CHUNK_VARIABLES 个参数分块执行 IN 查询，不会超出 sqlite 的参数个数上限；
+        键数超过 TEMP_KEYS_THRESHOLD、或为多列键时写入临时表（temp.sqlbase_keys_N）后 JOIN 查询
+        （sqlite 对 ``(a, b) IN ((?, ?), ...)`` 不使用索引，会扫描全表）
+        Args:
+            key_columns: 键列，多列（复合主键）时 keys 的每一项为同样长度的元组
+            keys: 键值，应已经过 prepare_value，重复的键只匹配一次
+            columns: 返回的列，默认为全部列（self.keys）
+        Returns:
+            按 columns 顺序的行元组列表，顺序不确定
+        """
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+            keys = [(key,) for key in keys]
+        else:
+            keys = [tuple(key) for key in keys]
+        if not keys:
+            return []
+        columns = list(columns or self.keys)
+        self.validate_column_names([*key_columns, *columns])
+        width = len(key_columns)
+        columns_str = ", ".join(f"t.[{col}]" for col in columns)
+        if width > 1 or len(keys) > TEMP_KEYS_THRESHOLD:
+            with self.temp_keys(keys) as temp_table:
+                on = " AND ".join(f"t.[{col}] = k.k{i}" for i, col in enumerate(key_columns))
+                self.cursor.execute(f"SELECT {columns_str} FROM {temp_table} AS k JOIN [{self.name}] AS t ON {on}")
+                return self.cursor.fetchall()
+        rows = []
+        for chunk in iter_chunks(keys, IN_CHUNK_VARIABLES):
+            placeholders = ", ".join(["?"] * len(chunk))
+            sql = f"SELECT {columns_str} FROM [{self.name}] AS t WHERE t.[{key_columns[0]}] IN ({placeholders})"
+            self.cursor.execute(sql, [key for key, in chunk])
+            rows.extend(self.cursor.fetchall())
+        return rows
+
+    @contextmanager
+    def temp_keys(self, keys: list[tuple]) -> Iterator[str]:
+        """
+        将键元组写入临时表 temp.sqlbase_keys_N（N 为元组长度，列名 k0..kN-1，重复的键只保留一个），
+        在 with 块中产出表名用于 JOIN，退出时清空临时表；
+        写临时表会开启隐式事务，进入时连接不在事务中则退出时提交，只读的查询路径不会遗留未结束的事务
+        """
+        connection = self.cursor.connection
+        in_transaction = connection.in_transaction
+        width = len(keys[0])
+        key_names = ", ".join(f"k{i}" for i in range(width))
+        temp_table = f"temp.[sqlbase_keys_{width}]"
+        self.cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS [sqlbase_keys_{width}] "
+                            f"({key_names}, PRIMARY KEY ({key_names})) WITHOUT ROWID")
+        self.cursor.execute(f"DELETE FROM {temp_table}")
+        try:
+            self.cursor.executemany(f"INSERT OR IGNORE INTO {temp_table} VALUES ({', '.join('?' * width)})", keys)
+            yield temp_table
+        finally:
+            self.cursor.execute(f"DELETE FROM {temp_table}")
+            if not in_transaction and connection.in_transaction:
+                connection.commit()
 
     def delete(self, where: str, params: tuple = ()) -> None:
         """
@@ -298,9 +412,85 @@ class TableHelper:
             return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
         return []
 
+    def iter_all(self, where: Optional[str] = None, params: tuple = (), order_by: Optional[str] = None,
+                 batch_size: int = 1000, row_type: str = "dict") -> Iterator[Any]:
+        """
+        流式获取记录，同 get_all，但逐行产出，内存占用与记录总数无关
+        Args:
+            where: WHERE子句
+            params: WHERE子句的参数
+            order_by: ORDER BY子句
+            batch_size, row_type: 同 iter_query
+        """
+        sql = f"SELECT * FROM [{self.name}]"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        return self.iter_query(sql, params, batch_size, row_type)
+
+    def iter_query(self, sql: str, params: tuple = (), batch_size: int = 1000,
+                   row_type: str = "dict") -> Iterator[Any]:
+        """
+        流式执行查询，逐行产出，结果不会一次性全部载入内存
+        使用独立游标按 batch_size 分批 fetchmany，迭代期间仍可使用 self.cursor 执行其他语句
+        Args:
+            row_type: 每行的类型，ROW_TYPES 之一
+                "dict"  - 列名到值的字典（同 query）
+                "row"   - sqlite3.Row，可按列名或下标取值，不为每行创建字典
+                "tuple" - 按列顺序的元组，开销最小
+        """
+        if row_type not in ROW_TYPES:
+            raise ValueError(f"row_type must be one of {ROW_TYPES}")
+        cursor = self.cursor.connection.cursor()
+        if row_type == "row":
+            cursor.row_factory = sqlite3.Row
+        try:
+            cursor.execute(sql, params)
+            columns = [col[0] for col in cursor.description] if cursor.description else []
+            while rows := cursor.fetchmany(batch_size):
+                if row_type == "dict":
+                    for row in rows:
+                        yield dict(zip(columns, row))
+                else:
+                    yield from rows
+        finally:
+            cursor.close()
+
     def delete_table(self):
         # 删除表，如果表存在的话
         self.cursor.execute(f'DROP TABLE IF EXISTS {self.name}')
+        self.invalidate_schema()
+
+    def create_indexes(self) -> None:
+        """
+        创建 indexes 中声明的索引（IF NOT EXISTS）
+        打开已有数据库时调用即可补建缺失的索引。
+        """
+        for index_name, columns in self.indexes.items():
+            self.validate_column_names([index_name, *columns])
+            columns_str = ", ".join(f"[{col}]" for col in columns)
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS [{index_name}] ON [{self.name}] ({columns_str})")
+        self.invalidate_schema()
+
+    def drop_indexes(self) -> None:
+        """删除 indexes 中声明的索引，用于大批量写入前暂时去掉索引"""
+        for index_name in self.indexes:
+            self.validate_column_names([index_name])
+            self.cursor.execute(f"DROP INDEX IF EXISTS [{index_name}]")
+        self.invalidate_schema()
+
+    def get_indexes(self) -> list[str]:
+        """获取表上已存在的索引名（包括主键等自动索引）"""
+        return list(self.get_schema().indexes)
+
+    def explain_query_plan(self, sql: str, params: tuple = ()) -> list[str]:
+        """
+        返回 EXPLAIN QUERY PLAN 的每一步说明，用于检查查询是否使用了索引
+        例如 ``["SEARCH excerpt_tags USING COVERING INDEX idx_excerpt_tags_tag_cid (tag_cid=?)"]``
+        """
+        self.cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in self.cursor.fetchall()]
     
     @staticmethod
     def validate_column_names(columns):
@@ -314,7 +504,7 @@ class IdTableHelper(TableHelper):
     """
     封装了SQLite3的游标，改对象有一个唯一的ID字段，用于唯一标识记录。
     """
-    __slots__ = ('cursor', 'name', 'columns', 'keys', 'id_column')
+    __slots__ = ('cursor', 'name', 'columns', 'keys', 'sql_cache', 'schema', 'id_column')
     def __init__(self, cursor: sqlite3.Cursor, name: str,
                  columns: list[tuple[str, str]], id_column: str):
         '''
@@ -347,12 +537,7 @@ class IdTableHelper(TableHelper):
         
         # 批量检查存在的记录
         id_values = [prepare_value(record[self.id_column]) for record in records]
-        placeholders = ", ".join(["?"] * len(id_values))
-        
-        # 查询已存在的 ID
-        existing_sql = f"SELECT [{self.id_column}] FROM [{self.name}] WHERE [{self.id_column}] IN ({placeholders})"
-        self.cursor.execute(existing_sql, id_values)
-        existing_ids = {row[0] for row in self.cursor.fetchall()}
+        existing_ids = {row[0] for row in self.select_in(self.id_column, id_values, [self.id_column])}
         
         # 分离需要插入和更新的记录
         records_to_insert = []
@@ -374,13 +559,15 @@ class IdTableHelper(TableHelper):
             
             self.cursor.executemany(self.get_insert_sql(columns), insert_data)
         
-        # 批量更新现有记录
-        for record in records_to_update:
-            id_value = prepare_value(record[self.id_column])
-            # 创建不包含主键的更新字典
-            updates = {col: record[col] for col in columns if col != self.id_column}
-            if updates:  # 确保有需要更新的字段
-                self.update(updates, f"[{self.id_column}] = ?", (id_value,))
+        # 批量更新现有记录（不包含主键列，同一语句 executemany）
+        update_columns = [col for col in columns if col != self.id_column]
+        if records_to_update and update_columns:  # 确保有需要更新的字段
+            sql = self.get_update_sql(update_columns, f"[{self.id_column}] = ?")
+            update_data = [
+                tuple(prepare_value(record.get(col)) for col in update_columns + [self.id_column])
+                for record in records_to_update
+            ]
+            self.cursor.executemany(sql, update_data)
 
     def insert_or_update_upsert(self, records: Union[dict[str, Any], Iterable[dict[str, Any]]]) -> None:
         '''使用 UPSERT 语法插入或更新记录（更高效）'''
@@ -395,24 +582,17 @@ class IdTableHelper(TableHelper):
         data = [tuple(prepare_value(r.get(col)) for col in columns) for r in records]
         
         # 构建 UPSERT SQL
-        placeholders = ", ".join(["?"] * len(columns))
-        columns_str = ", ".join([f"[{col}]" for col in columns])
+        def build() -> str:
+            # 构建 SET 子句（更新除主键外的所有列）
+            set_clause = ", ".join([f"[{col}] = excluded.[{col}]" for col in columns if col != self.id_column])
+            return f"{self.get_insert_sql(columns)} ON CONFLICT([{self.id_column}]) DO UPDATE SET {set_clause}"
         
-        # 构建 SET 子句（更新除主键外的所有列）
-        set_clause = ", ".join([f"[{col}] = excluded.[{col}]" for col in columns if col != self.id_column])
-        
-        upsert_sql = f"""
-        INSERT INTO [{self.name}] ({columns_str}) 
-        VALUES ({placeholders})
-        ON CONFLICT([{self.id_column}]) DO UPDATE SET {set_clause}
-        """
-        
-        self.cursor.executemany(upsert_sql, data)
+        self.cursor.executemany(self.cached_sql(("upsert", tuple(columns)), build), data)
 
     def update_pairs(self, pairs: dict[str, Any], other_column: str) -> None:
         """更新记录（按键值对）"""
         params = [(other, id_) for (id_, other) in pairs.items()]
-        sql = f"UPDATE [{self.name}] SET [{other_column}] = ? WHERE [{self.id_column}] = ?"
+        sql = self.get_update_sql([other_column], f"[{self.id_column}] = ?")
         self.cursor.executemany(sql, params)
 
     def delete_by_cid(self, line_id: str) -> None:
@@ -425,32 +605,109 @@ class IdTableHelper(TableHelper):
 
 
 
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """
+    数据库连接配置，打开连接时以 PRAGMA 应用
+    默认使用 WAL 日志：读连接与写连接互不阻塞，适合 flask 读取与 qt 写入同时进行。
+    """
+    journal_mode : str  = "WAL"       # 日志模式，只读连接不设置
+    synchronous  : str  = "NORMAL"    # WAL 下 NORMAL 已能保证一致性
+    mmap_size    : int  = 256 * 1024 * 1024 # 内存映射读取的字节数，0 表示关闭
+    cache_size   : int  = -32000      # 页缓存，负数表示 KiB
+    temp_store   : str  = "MEMORY"    # 临时表和排序放在内存中
+    busy_timeout : int  = 5000        # 数据库被锁定时的等待毫秒数
+    cached_statements : int = 512     # 每个连接缓存的预编译语句数（sqlite3 默认 128）
+    read_only    : bool = False       # 以 URI mode=ro 打开，禁止一切写入
+
+    def readonly(self) -> 'ConnectionProfile':
+        """返回同样配置的只读版本"""
+        return replace(self, read_only=True)
+
+
+DEFAULT_PROFILE = ConnectionProfile()
+READONLY_PROFILE = DEFAULT_PROFILE.readonly()
+
+
+
+
 class SqlbaseHelper:
     """
     数据库管理器类，用于处理数据的存储与检索
     """
-    __slots__ = ('db_path', 'db_key', 'conn', 'cursor', 'table_helpers')
+    __slots__ = ('db_path', 'db_key', 'conn', 'cursor', 'table_helpers', 'attach', 'check_same_thread', 'profile')
     _instances: dict[int, 'SqlbaseHelper'] = {}
-    def __init__(self, db_path: Path) -> None:
+    def __init__(self, db_path: Path, attach: bool = False, check_same_thread: bool = True,
+                 profile: ConnectionProfile = DEFAULT_PROFILE) -> None:
         """
         初始化数据库管理器
         Args:
             db_path (str): 数据库文件路径，默认为""
+            attach (bool): 轻量打开，数据库已在本进程初始化过时跳过建表（由子类实现）
+            check_same_thread (bool): 为 False 时连接可以交给其他线程使用（连接池）
+            profile (ConnectionProfile): 连接配置，只读配置不会建表
         """
         self.db_path: Path = db_path
         self.db_key = hash(db_path)
         self.conn: Optional[sqlite3.Connection] = None
         self.cursor: Optional[sqlite3.Cursor] = None
         self.table_helpers: dict[str, TableHelper] = {}
+        self.attach: bool = attach
+        self.check_same_thread: bool = check_same_thread
+        self.profile: ConnectionProfile = profile
         self.init_database()
 
     def init_database(self) -> None:
         """初始化数据库连接和表结构"""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path)
+            if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+                raise RuntimeError(f"sqlite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required, "
+                                   f"found {sqlite3.sqlite_version}")
+            timeout = self.profile.busy_timeout / 1000
+            if self.profile.read_only:
+                uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+                self.conn = sqlite3.connect(uri, uri=True, timeout=timeout,
+                                            check_same_thread=self.check_same_thread,
+                                            cached_statements=self.profile.cached_statements)
+            else:
+                self.conn = sqlite3.connect(self.db_path, timeout=timeout,
+                                            check_same_thread=self.check_same_thread,
+                                            cached_statements=self.profile.cached_statements)
             self.conn.execute("PRAGMA foreign_keys = ON")  # 启用外键
+            self.apply_profile()
             self.cursor = self.conn.cursor()
-    
+
+    def apply_profile(self) -> None:
+        """将连接配置以 PRAGMA 应用到当前连接"""
+        profile = self.profile
+        if not profile.read_only and profile.journal_mode:
+            self.conn.execute(f"PRAGMA journal_mode = {profile.journal_mode}")
+        self.conn.execute(f"PRAGMA synchronous = {profile.synchronous}")
+        self.conn.execute(f"PRAGMA mmap_size = {int(profile.mmap_size)}")
+        self.conn.execute(f"PRAGMA cache_size = {int(profile.cache_size)}")
+        self.conn.execute(f"PRAGMA temp_store = {profile.temp_store}")
+        self.conn.execute(f"PRAGMA busy_timeout = {int(profile.busy_timeout)}")
+
+    def backup_to(self, path: Union[str, Path], pages_per_step: int = 256,
+                  progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """
+        使用 sqlite 在线备份将数据库复制到 path（已存在时覆盖其内容）
+        每次只复制 pages_per_step 页，步骤之间释放读锁，备份期间其他连接仍可读写；
+        复制过程中源数据库被修改时 sqlite 会自动重新复制，得到的始终是一致的快照
+        Args:
+            path: 目标数据库文件
+            pages_per_step: 每步复制的页数，<= 0 表示一次复制全部
+            progress: 每步之后以 (已复制页数, 总页数) 调用
+        """
+        def on_step(status: int, remaining: int, total: int) -> None:
+            progress(total - remaining, total)
+
+        target = sqlite3.connect(path)
+        try:
+            self.conn.backup(target, pages=pages_per_step, progress=on_step if progress else None)
+        finally:
+            target.close()
+
     @classmethod
     def instance(cls, key: int = 0) -> Optional['SqlbaseHelper']:
         return cls._instances.get(key, None)
@@ -497,6 +754,19 @@ class SqlbaseHelper:
         if name not in self.table_helpers:
             raise ValueError(f"Table helper for '{name}' not found")
         return self.table_helpers[name]
+
+    def get_schema(self, name: str) -> TableSchema:
+        """获取表结构（主键、列类型、索引），由对应的 TableHelper 按连接缓存"""
+        return self.get_table_helper(name).get_schema()
+
+    def invalidate_schema(self, name: Optional[str] = None) -> None:
+        """
+        清除表结构缓存，name 为空时清除所有表助手的缓存
+        不经过 TableHelper 直接执行 DDL 后调用
+        """
+        helpers = [self.get_table_helper(name)] if name else self.table_helpers.values()
+        for helper in helpers:
+            helper.invalidate_schema()
     
     def get_cursor(self) -> sqlite3.Cursor:
         """获取数据库游标"""
@@ -533,3 +803,72 @@ class SqlbaseHelper:
         else:
             self.commit()
         self.close()
+
+
+
+class SqlbasePool:
+    """
+    按数据库路径分组的连接池，用于 Flask 等多线程场景复用 SqlbaseHelper
+    - 每个路径最多打开 max_size 个连接，取完后 acquire 等待归还
+    - 新连接以 attach 模式打开，同一数据库只在第一次打开时建表
+    - 连接允许跨线程传递，但同一时刻只被一个线程持有
+    """
+    def __init__(self, helper_cls: type[SqlbaseHelper], max_size: int = 4,
+                 profile: ConnectionProfile = DEFAULT_PROFILE) -> None:
+        self.helper_cls: type[SqlbaseHelper] = helper_cls
+        self.max_size: int = max_size
+        self.profile: ConnectionProfile = profile
+        self.lock = threading.Lock()
+        self.idle: dict[str, queue.LifoQueue] = {}   # 空闲连接
+        self.opened: dict[str, int] = {}             # 已打开的连接数
+
+    def acquire(self, db_path: Path, timeout: Optional[float] = None) -> SqlbaseHelper:
+        """
+        取出一个连接，没有空闲连接且未达上限时新建
+        Args:
+            timeout: 连接数已达上限时的最长等待秒数，None 表示一直等待
+        Raises:
+            queue.Empty: 等待超时
+        """
+        key = str(db_path)
+        with self.lock:
+            idle = self.idle.setdefault(key, queue.LifoQueue())
+            create = idle.empty() and self.opened.get(key, 0) < self.max_size
+            if create:
+                self.opened[key] = self.opened.get(key, 0) + 1
+        if not create:
+            return idle.get(timeout=timeout)
+        try:
+            return self.helper_cls(Path(key), attach=True, check_same_thread=False, profile=self.profile)
+        except Exception:
+            with self.lock:
+                self.opened[key] -= 1
+            raise
+
+    def release(self, helper: SqlbaseHelper, rollback: bool = False) -> None:
+        """归还连接，提交（或回滚）未完成的事务；已关闭的连接不再放回"""
+        key = str(helper.db_path)
+        if helper.conn is not None:
+            try:
+                if rollback:
+                    helper.rollback()
+                else:
+                    helper.commit()
+            except sqlite3.Error:
+                # 连接状态异常，直接丢弃
+                helper.conn.close()
+                helper.conn = None
+                helper.cursor = None
+        if helper.conn is None:
+            with self.lock:
+                self.opened[key] = max(self.opened.get(key, 1) - 1, 0)
+            return
+        self.idle.setdefault(key, queue.LifoQueue()).put(helper)
+
+    def close_all(self) -> None:
+        """关闭所有空闲连接"""
+        with self.lock:
+            for key, idle in self.idle.items():
+                while not idle.empty():
+                    idle.get_nowait().close()
+                    self.opened[key] -= 1
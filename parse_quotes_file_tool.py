@@ -2,7 +2,7 @@
 段落结构如下：
 
 标签：以#开头（文件开头的#，换行+#，标签行的#），一行或多行，每个标签必须在一行内完成且仅包含中英文、数字和运算符，多个标签可以分布在多行，直至其他标识。
-创建时间：以%开头，一行。
+创建时间：以%开头，一行（建议使用 ISO 格式，如 %2025-01-02T10:00:00，按此排序）。
 来源：以@开头（换行+@），一行。
 标题：以‘《》’包括（换行+《），一行。
 作者：作者应以‘作者：’开头（换行+作者：），一行。
@@ -10,7 +10,7 @@
 正文角标：正文中以‘[]’标注，仅包含中英文、数字。
 注释：以‘注释：’开头（换行+注释：），多行，空行不计，直至其他标识。
 相关：以‘相关：’开头（换行+相关：），多行，空行不计，直至其他标识。
-附件：以‘相关：’开头（换行+附件：），多行，空行不计，每行一条，直至其他标识。
+附件：以‘附件：’开头（换行+附件：），多行，空行不计，每行一条，直至其他标识。
 
 json格式如下：
 {
@@ -35,8 +35,9 @@ json格式如下：
 '''
 
 
-import re, json
-from typing import TypedDict
+import os, io, re, json, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypedDict, Iterable, Iterator, TextIO, Optional, Callable
 
 
 class ExcerptDict(TypedDict):
@@ -49,61 +50,191 @@ class ExcerptDict(TypedDict):
     created_at : str            = '' # 创建时间
     tags       : list[str]      = [] # 标签ID列表
     tag_cids   : list[str]      = [] # 标签ID列表
+    related    : list[str]      = [] # 相关（同时并入 note）
+    attachments: list[str]      = [] # 附件，每行一条
+    footnotes  : list[str]      = [] # 正文角标
 
 
-def parse_quotes_file(file_path: str) -> list[ExcerptDict]:
+def iter_sections(file: TextIO) -> Iterator[list[str]]:
+    """
+    逐行读取文本，以空行（含只有空白的行）为界逐段产出，每段为去除首尾空白的非空行列表
+    """
+    lines = []
+    for line in file:
+        line = line.strip()
+        if line:
+            lines.append(line)
+        elif lines:
+            yield lines
+            lines = []
+    if lines:
+        yield lines
+
+
+# 行首字符 -> (前缀, 后缀, 字段)，每行只需一次字典查找即可确定标识
+LINE_RULES: dict[str, tuple[str, str, str]] = {
+    '#': ('#', '', 'tags'),
+    '%': ('%', '', 'created_at'),
+    '@': ('@', '', 'source'),
+    '《': ('《', '》', 'title'),
+    '作': ('作者：', '', 'author'),
+    '注': ('注释：', '', 'note'),
+    '相': ('相关：', '', 'related'),
+    '附': ('附件：', '', 'attachments'),
+}
+MULTILINE_KEYS = frozenset(('note', 'related', 'attachments'))
+FOOTNOTE_PATTERN = re.compile(r'\[([0-9A-Za-z\u4e00-\u9fff]+)\]')
+
+
+def parse_section(lines: list[str]) -> ExcerptDict:
+    """
+    单遍状态机解析一个段落：按行首字符查表识别标识，
+    正文、注释、相关、附件为多行字段，后续无标识的行接在当前字段后，
+    其余标识为单行字段，之后无标识的行重新归入正文
+    Args:
+        lines: 段落的非空行（已去除首尾空白）
+    """
+    excerpt = ExcerptDict()
+    tags = {}  # 按出现顺序去重，保证多进程解析结果一致
+    content = current = []
+    blocks = {}  # 注释、相关、附件，出现时才创建
+    for line in lines:
+        rule = LINE_RULES.get(line[0])
+        if rule is None or not line.startswith(rule[0]) or not line.endswith(rule[1]):
+            current.append(line)
+            continue
+        prefix, suffix, key = rule
+        value = line[len(prefix):len(line) - len(suffix)].strip()
+        if key in MULTILINE_KEYS:
+            current = blocks.setdefault(key, [])
+            if value:
+                current.append(value)
+            continue
+        current = content
+        if key == 'tags':
+            tags.update(dict.fromkeys(tag for tag in map(str.strip, value.split('#')) if tag))
+        else:
+            excerpt[key] = value
+    excerpt["tags"] = list(tags)
+    excerpt["content"] = '\n'.join(content)
+    if blocks:
+        # 数据库只有 note 一个字段，相关内容接在注释之后一并保存
+        if note := blocks.get("note", []) + blocks.get("related", []):
+            excerpt["note"] = '\n'.join(note)
+        for key in ("related", "attachments"):
+            if blocks.get(key):
+                excerpt[key] = blocks[key]
+    if '[' in excerpt["content"] and (footnotes := FOOTNOTE_PATTERN.findall(excerpt["content"])):
+        excerpt["footnotes"] = footnotes
+    return excerpt
+
+
+def iter_quotes(file_path: str) -> Iterator[ExcerptDict]:
+    """
+    流式解析文本文件，每次产出一条摘录，内存占用与文件大小无关
+    Args:
+        file_path: 文本文件路径
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for lines in iter_sections(file):
+            yield parse_section(lines)
+
+
+def parse_quotes_file(file_path: str) -> tuple[list[ExcerptDict], list[str]]:
     """
     解析包含多个引用的文本文件
     Args:
         file_path: 文本文件路径
     Returns:
-        解析后的Quote对象列表
+        解析后的摘录列表和所有标签
     """
-    quotes = []
-    p_tags = set()
-    
-    # try:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    # 按空行分割不同的引用段落
-    # 使用正则表达式分割，确保处理多个连续空行
-    sections = re.split(r'\n\s*\n', content.strip())
-    for section in sections:
-        if not section.strip():
-            continue  # 跳过空段落
-        # 解析每个段落
-        lines = section.strip().split('\n')
-        # 内容部分（可能有多行，直到遇到"作者："）
-        excerpt = ExcerptDict()
-        tags = set()
-        content = []
-        for line in lines:
-            line = line.strip()
-            if line.startswith('作者：'):
-                excerpt["author"] = line[3:].strip()  # 去掉"作者："前缀
-            elif line.startswith('相关：'):
-                excerpt["note"] = line[3:].strip()  # 去掉"相关："前缀
-            elif line.startswith('《') and line.endswith('》'):
-                excerpt["title"] = line[1:-1].strip()
-            elif line.startswith('@'):
-                excerpt["source"] = line[1:].strip()  # 去掉"@"前缀
-            elif line.startswith('#'):
-                ns = set(line[1:].strip().split("#"))
-                tags |= ns
+    quotes = list(iter_quotes(file_path))
+    p_tags = dict.fromkeys(tag for quote in quotes for tag in quote["tags"])
+    return quotes, list(p_tags)
+
+
+def split_ranges(file_path: str, chunks: int) -> list[tuple[int, int]]:
+    """
+    将文件按字节大致均分为 chunks 块，每个分界点向后移动到下一个空行之后，保证段落不被切开
+    Returns:
+        list[tuple[int, int]]: 按文件顺序排列的 (起始字节, 结束字节)
+    """
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, 'rb') as file:
+        for i in range(1, chunks):
+            offset = size * i // chunks
+            if offset <= bounds[-1]:
+                continue
+            file.seek(offset)
+            file.readline()  # 跳过可能不完整的一行
+            while (line := file.readline()) and line.strip():
                 pass
-            else:
-                content.append(line)
-        p_tags |= tags
-        excerpt["tags"] = list(tags)
-        excerpt["content"] = '\n'.join(content)
-        quotes.append(excerpt)
-    # except FileNotFoundError:
-    #     print(f"错误：找不到文件 {file_path}")
-    # except Exception as e:
-    #     print(f"解析文件时出错: {e}")
+            if file.tell() >= size:
+                break
+            bounds.append(file.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _parse_range(file_path: str, start: int, end: int) -> list[ExcerptDict]:
+    """解析文件中 [start, end) 字节范围内的段落（在子进程中运行）"""
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    # 与以文本模式打开文件时相同的换行处理：只按 \n、\r、\r\n 分行（str.splitlines 还会按 \u2028 等分行）
+    return [parse_section(lines) for lines in iter_sections(io.StringIO(text, newline=None))]
+
+
+def parse_quotes_file_parallel(file_path: str, workers: Optional[int] = None,
+                               chunks: Optional[int] = None) -> tuple[list[ExcerptDict], list[str]]:
+    """
+    多进程解析文本文件，结果与 parse_quotes_file 相同（按文件顺序合并摘录和标签）
+    Args:
+        file_path: 文本文件路径
+        workers: 进程数，默认为 CPU 核数
+        chunks: 切分块数，默认为进程数的 4 倍
+    Returns:
+        解析后的摘录列表和所有标签
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(file_path, chunks or workers * 4)
+    quotes = []
+    if not ranges:
+        return quotes, []
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        starts, ends = zip(*ranges)
+        for part in executor.map(_parse_range, [file_path] * len(ranges), starts, ends):
+            quotes.extend(part)
+    p_tags = dict.fromkeys(tag for quote in quotes for tag in quote["tags"])
     return quotes, list(p_tags)
 
 
+def import_quotes(quotes: Iterable[ExcerptDict], manager, batch_size: int = 5000,
+                  progress: Optional[Callable[[int], None]] = None):
+    """
+    将摘录按批写入数据库：每批先创建其中缺少的标签，再批量写入摘录，每批提交一次
+    Args:
+        quotes: 摘录，通常为 iter_quotes 的返回值
+        manager: SqlDataManager
+        batch_size: 每批条数
+        progress: 每写入一批后以已导入的条数调用
+    Returns:
+        ImportStats: 导入条数与速度
+    """
+    from excerpts.sqlutils import ImportStats, iter_chunks
+
+    stats = ImportStats()
+    start = time.perf_counter()
+    for batch in iter_chunks(quotes, batch_size):
+        name_map = manager.insert_tags_names(tag for quote in batch for tag in quote["tags"])
+        stats.rows += manager.insert_excerpts_dict(batch, name_map = name_map).rows
+        if progress:
+            progress(stats.rows)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
 def main():
     # 配置文件名
     input_file = "数据1.txt"  # 你的文本文件名
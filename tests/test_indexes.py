@@ -0,0 +1,60 @@
+'''
+检查热点查询是否使用 DataExcerptTags / DataExcerpts 声明的二级索引（EXPLAIN QUERY PLAN）
+
+运行：python -m pytest tests 或 python -m unittest discover tests
+'''
+
+
+
+import unittest, tempfile
+from pathlib import Path
+
+from excerpts.sqlutils.datatool import SqlDataManager, PAGE_ORDER
+
+
+class TestIndexes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manager = SqlDataManager(Path(self.temp_dir.name)/"indexes.db")
+        self.excerpts = self.manager.get_excerpts_helper()
+        self.excerpt_tags = self.excerpts.excerpt_tags
+
+    def tearDown(self) -> None:
+        self.manager.close()
+        self.temp_dir.cleanup()
+
+    def assert_uses_index(self, helper, index_name: str, sql: str, params: tuple = ()) -> None:
+        plan = helper.explain_query_plan(sql, params)
+        self.assertTrue(any(index_name in step for step in plan), f"{index_name} not used: {plan}")
+
+    def test_indexes_created(self) -> None:
+        self.assertIn("idx_excerpt_tags_tag_cid", self.excerpt_tags.get_indexes())
+        for index_name in ("idx_excerpts_author", "idx_excerpts_source", "idx_excerpts_created_at"):
+            self.assertIn(index_name, self.excerpts.get_indexes())
+
+    def test_excerpts_by_tag(self) -> None:
+        sql = f"SELECT excerpt_cid FROM {self.excerpt_tags.name} WHERE tag_cid = ?"
+        self.assert_uses_index(self.excerpt_tags, "idx_excerpt_tags_tag_cid", sql, ("default",))
+
+    def test_excerpts_count(self) -> None:
+        sql = f"SELECT COUNT(*) FROM {self.excerpt_tags.name} WHERE tag_cid = ?"
+        self.assert_uses_index(self.excerpt_tags, "idx_excerpt_tags_tag_cid", sql, ("default",))
+
+    def test_by_author(self) -> None:
+        sql = self.excerpts.select_with_tags_sql("e.author = ?", PAGE_ORDER, limit=21)
+        self.assert_uses_index(self.excerpts, "idx_excerpts_author", sql, ("作者",))
+
+    def test_by_source(self) -> None:
+        sql = self.excerpts.select_with_tags_sql("e.source = ?", PAGE_ORDER, limit=21)
+        self.assert_uses_index(self.excerpts, "idx_excerpts_source", sql, ("来源",))
+
+    def test_keyset_page(self) -> None:
+        sql = self.excerpts.select_with_tags_sql("(e.created_at, e.cid) < (?, ?)", PAGE_ORDER, limit=21)
+        params = ("2025-01-01T00:00:00", "cid")
+        self.assert_uses_index(self.excerpts, "idx_excerpts_created_at", sql, params)
+        plan = self.excerpts.explain_query_plan(sql, params)
+        self.assertFalse(any("TEMP B-TREE" in step for step in plan), plan)
+
+
+if __name__ == "__main__":
+    unittest.main()